@@ -0,0 +1,32 @@
+# benchmarks/bench_chat.py
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("flet")
+
+from conftest import reply_stream
+
+
+def make_messages(n: int) -> list:
+    lines = reply_stream(n)
+    return [
+        {"from": "user" if i % 10 == 0 else "gpib", "text": ln.decode().strip(), "ts": 1.0e9 + i}
+        for i, ln in enumerate(lines)
+    ]
+
+
+@pytest.mark.parametrize("history", [100, 500, 5_000])
+def test_render_messages(benchmark, history):
+    # render_messages reconstruye una burbuja por mensaje de la ventana del store
+    import flet as ft
+    import chat
+    from storage.data.message_storage import MessageStore
+
+    store = MessageStore()
+    store.add_messages(make_messages(history))
+    view = ft.ListView()
+
+    def render():
+        view.controls = [chat.message_bubble(m) for m in store.get_messages()]
+
+    benchmark(render)
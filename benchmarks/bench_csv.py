@@ -0,0 +1,16 @@
+# benchmarks/bench_csv.py
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("serial")
+
+from conftest import sweep_values
+
+
+@pytest.mark.parametrize("points", [10, 1_000, 100_000])
+def test_save_thd_csv(benchmark, tmp_path, points, capsys):
+    from serial_service import SerialService
+    svc = SerialService(port="bench", auto_read=False)
+    values = sweep_values(points)
+    path = str(tmp_path / "thd_data.csv")
+    benchmark(svc.save_thd_csv, values, path)
@@ -0,0 +1,39 @@
+# benchmarks/bench_graph.py
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("flet")
+pd = pytest.importorskip("pandas")
+
+from conftest import sweep_values
+
+
+def make_df(points: int) -> "pd.DataFrame":
+    return pd.DataFrame({
+        "Frecuencia": [1000 + i * 1000 for i in range(points)],
+        "THD": [f"{v:.6f}" for v in sweep_values(points)],
+    })
+
+
+@pytest.mark.parametrize("points", [10, 1_000, 10_000])
+def test_create_figure(benchmark, points):
+    import graph
+    df = make_df(points)
+    benchmark(graph.create_figure, df, 800, 600)
+
+
+@pytest.mark.parametrize("points", [10, 1_000, 10_000])
+def test_live_figure_set_data(benchmark, points):
+    import graph
+    df = make_df(points)
+    live = graph.LiveThdFigure(800, 600)
+    version = iter(range(10**9))
+    benchmark(lambda: live.set_data(df, next(version)))
+
+
+@pytest.mark.parametrize("points", [10, 1_000, 100_000])
+def test_poll_csv_read(benchmark, tmp_path, points):
+    # Lo que hace poll_csv en cada cambio del archivo
+    path = tmp_path / "thd_data.csv"
+    make_df(points).to_csv(path, index=False)
+    benchmark(pd.read_csv, path)
@@ -0,0 +1,29 @@
+# benchmarks/bench_parsing.py
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("serial")
+
+from conftest import LineSerial, reply_stream
+
+
+@pytest.fixture
+def svc(capsys):
+    from serial_service import SerialService
+    s = SerialService(port="bench", auto_read=False)
+    s.ser = LineSerial(reply_stream(2000))
+    return s
+
+
+def test_try_read_numeric_once_mix(benchmark, svc, capsys):
+    # Cada llamada lee hasta encontrar un número (o agotar max_wait)
+    def run():
+        for _ in range(100):
+            svc._try_read_numeric_once(max_wait=1.0)
+
+    benchmark(run)
+
+
+def test_try_read_numeric_once_clean(benchmark, svc, capsys):
+    svc.ser = LineSerial([b"9.100000\r\n"])
+    benchmark(svc._try_read_numeric_once, 1.0)
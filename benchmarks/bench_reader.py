@@ -0,0 +1,101 @@
+# benchmarks/bench_reader.py
+import io
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("serial")
+
+from conftest import ChunkSerial, reply_stream
+
+LINES = 2000
+BLOB = b"".join(reply_stream(LINES))
+
+
+class _Sink:
+    """Consumidor de texto mínimo (hace de pubsub del chat)."""
+
+    def __init__(self):
+        self.n = 0
+
+    def send_all(self, msg):
+        self.n += 1
+
+
+class _NullLog:
+    """Log que descarta lo escrito: el pico de memoria mide solo el lector."""
+
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def _legacy_loop(ser, log_file, emit, echo=True):
+    # Cuerpo anterior de start_read: readline → decode → strip → texto + "\r\n" → print
+    for _ in range(LINES):
+        line = ser.readline()
+        if not line:
+            continue
+        txt = line.decode("utf-8", errors="ignore").strip()
+        if txt:
+            emit(txt)
+            if echo:
+                print(f"[Arduino] {txt}")
+            log_file.write(txt + "\r\n")
+            log_file.flush()
+
+
+def _svc(pubsub=None):
+    from serial_service import SerialService
+    s = SerialService(port="bench", auto_read=False, pubsub=pubsub)
+    s.ser = ChunkSerial(BLOB)
+    return s
+
+
+def _reader_loop(svc, log_file):
+    from line_reader import LineReader
+    reader = LineReader(svc.ser)
+    total = 0
+    while total < len(BLOB):
+        total += svc._pump_lines(reader, log_file)
+
+
+def _allocations(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_read_loop_legacy(benchmark, capsys):
+    ser = ChunkSerial(BLOB)
+    sink = _Sink()
+    benchmark(lambda: _legacy_loop(ser, io.StringIO(), lambda t: sink.send_all({"text": t})))
+
+
+def test_read_loop_linereader_chat(benchmark):
+    # Con consumidor de texto (chat): decodifica, pero sin eco ni re-codificar el log
+    svc = _svc(pubsub=_Sink())
+    benchmark(lambda: _reader_loop(svc, io.BytesIO()))
+
+
+def test_read_loop_linereader_log_only(benchmark):
+    # Sin consumidores de texto: solo bytes crudos al log, sin decodificar
+    svc = _svc()
+    benchmark(lambda: _reader_loop(svc, io.BytesIO()))
+
+
+def test_read_loop_allocations(capsys):
+    # Pico de memoria asignada procesando el mismo bloque con cada camino
+    ser = ChunkSerial(BLOB)
+    sink = _Sink()
+    legacy = _allocations(lambda: _legacy_loop(ser, _NullLog(), lambda t: sink.send_all({"text": t})))
+    svc = _svc(pubsub=_Sink())
+    new = _allocations(lambda: _reader_loop(svc, _NullLog()))
+    print(f"pico legacy={legacy} B, LineReader={new} B")
+    assert new < legacy
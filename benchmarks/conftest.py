@@ -0,0 +1,106 @@
+# benchmarks/conftest.py
+import os
+import random
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _workdir(tmp_path_factory):
+    """
+    Los módulos de la app crean archivos en el cwd al importarse (messages.db,
+    thd_archive/); los benchmarks corren en un directorio temporal.
+    """
+    old = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("bench_cwd"))
+    yield
+    os.chdir(old)
+
+
+# Mezcla de respuestas observada en log.txt / sesiones reales del Amber 5500 + Arduino GPIB
+REPLY_MIX = [
+    (b"9.100000\r\n", 40),
+    (b"0,0123\r\n", 15),
+    (b"THD= 0.4312 %\r\n", 10),
+    (b"\r\n", 10),
+    (b">\r\n", 5),
+    (b"gpibWrite: timeout waiting NDAC\r\n", 8),
+    (b"set_comm_cntx: gpib write failed @1\r\n", 6),
+    (b"gpibTalk: set_comm-cntx failed.\r\n", 6),
+]
+
+
+def reply_stream(n: int, seed: int = 1234) -> list:
+    """n líneas con la distribución de REPLY_MIX (reproducible)."""
+    rnd = random.Random(seed)
+    lines, weights = zip(*REPLY_MIX)
+    return rnd.choices(lines, weights=weights, k=n)
+
+
+class LineSerial:
+    """Serial en memoria que devuelve líneas en ciclo (sin esperas)."""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._i = 0
+        self.is_open = True
+
+    def readline(self) -> bytes:
+        line = self._lines[self._i]
+        self._i = (self._i + 1) % len(self._lines)
+        return line
+
+    def write(self, data) -> int:
+        return len(data)
+
+    def reset_input_buffer(self):
+        pass
+
+
+def sweep_values(n: int, seed: int = 42) -> list:
+    rnd = random.Random(seed)
+    return [rnd.uniform(0.01, 10.0) for _ in range(n)]
+
+
+class ChunkSerial:
+    """
+    Serial en memoria que entrega un bloque de bytes en ciclo, de a 'chunk'
+    (como llegan por USB-serie): soporta readline(), read() y readinto().
+    """
+
+    def __init__(self, blob: bytes, chunk: int = 64):
+        self._blob = blob
+        self._pos = 0
+        self._chunk = chunk
+        self.is_open = True
+
+    @property
+    def in_waiting(self) -> int:
+        return min(self._chunk, len(self._blob) - self._pos)
+
+    def _take(self, n: int) -> bytes:
+        data = self._blob[self._pos:self._pos + n]
+        self._pos += len(data)
+        if self._pos >= len(self._blob):
+            self._pos = 0
+        return data
+
+    def readline(self) -> bytes:
+        i = self._blob.find(b"\n", self._pos)
+        return self._take((len(self._blob) if i < 0 else i + 1) - self._pos)
+
+    def read(self, size: int = 1) -> bytes:
+        return self._take(size)
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._blob) - self._pos)
+        b[:n] = self._blob[self._pos:self._pos + n]
+        self._pos += n
+        if self._pos >= len(self._blob):
+            self._pos = 0
+        return n
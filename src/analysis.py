@@ -0,0 +1,268 @@
+# src/analysis.py
+"""
+Post-procesamiento vectorizado (NumPy) de barridos THD vs Frecuencia.
+
+Todas las funciones trabajan sobre arrays 1D (un barrido) o 2D (lote de
+barridos, una fila por corrida, eje -1 = frecuencia) y evitan copias:
+np.asarray no copia si el dtype ya es float, y las operaciones que
+modifican aceptan 'out' para escribir en el mismo buffer.
+"""
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+# Frecuencia de referencia para bandas de octava / tercio (IEC 61260, base 10)
+REF_HZ = 1000.0
+AUDIO_RANGE = (20.0, 20000.0)
+
+
+# ---------- Normalización ----------
+def to_float_array(values) -> np.ndarray:
+    """
+    Convierte valores a float64 sin copiar si ya son numéricos.
+    Acepta strings con coma decimal ('9,1') y vacíos/basura → NaN.
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind == "f":
+        return arr
+    if arr.dtype.kind in "iub":
+        return arr.astype(np.float64)
+    # Texto / objeto: normalización de locale en un solo paso
+    txt = np.char.replace(arr.astype(str), ",", ".")
+    try:
+        return txt.astype(np.float64)
+    except ValueError:
+        pass
+    # Camino lento solo si hay celdas no numéricas
+    out = np.full(txt.shape, np.nan)
+    flat_in, flat_out = txt.ravel(), out.ravel()
+    for i, s in enumerate(flat_in):
+        try:
+            flat_out[i] = float(s)
+        except ValueError:
+            pass
+    return out
+
+
+def to_percent(thd, unit: str = "%", out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Normaliza THD a porcentaje.
+      unit: '%' (sin cambios), 'ratio' (0..1) o 'dB' (20·log10 de la relación).
+    """
+    thd = to_float_array(thd)
+    u = unit.strip().lower()
+    if u in ("%", "pct", "percent"):
+        if out is not None and out is not thd:
+            np.copyto(out, thd)
+            return out
+        return thd
+    if u == "ratio":
+        return np.multiply(thd, 100.0, out=out)
+    if u == "db":
+        res = np.divide(thd, 20.0, out=out)
+        np.power(10.0, res, out=res)
+        res *= 100.0
+        return res
+    raise ValueError(f"Unidad de THD no soportada: {unit}")
+
+
+def freq_to_hz(freq, unit: str = "Hz") -> np.ndarray:
+    """Normaliza frecuencias a Hz ('Hz' o 'kHz')."""
+    freq = to_float_array(freq)
+    u = unit.strip().lower()
+    if u == "hz":
+        return freq
+    if u in ("khz", "kz"):
+        return freq * 1000.0
+    raise ValueError(f"Unidad de frecuencia no soportada: {unit}")
+
+
+# ---------- Limpieza ----------
+def reject_outliers(thd, k: float = 3.5, max_valid: float = 100.0, inplace: bool = False) -> np.ndarray:
+    """
+    Marca como NaN los outliers según MAD (mediana de desvíos absolutos) sobre
+    el último eje y los valores fuera de [0, max_valid].
+    Con inplace=True escribe sobre el array recibido (debe ser float).
+    """
+    arr = to_float_array(thd)
+    res = arr if inplace else arr.copy()
+    with np.errstate(invalid="ignore"):
+        res[(res < 0) | (res > max_valid)] = np.nan
+        med = np.nanmedian(res, axis=-1, keepdims=True)
+        dev = np.abs(res - med)
+        mad = np.nanmedian(dev, axis=-1, keepdims=True)
+        # 0.6745: consistencia con desvío estándar para datos normales
+        score = np.divide(0.6745 * dev, mad, out=np.zeros_like(dev), where=mad > 0)
+    res[score > k] = np.nan
+    return res
+
+
+def smooth(thd, window: int = 3) -> np.ndarray:
+    """
+    Media móvil centrada sobre el último eje, ignorando NaN
+    (los bordes usan solo los vecinos disponibles).
+    """
+    arr = to_float_array(thd)
+    if window <= 1:
+        return arr
+    valid = ~np.isnan(arr)
+    filled = np.where(valid, arr, 0.0)
+    # Suma acumulada → ventana deslizante en O(n) sobre todo el lote
+    pad = window // 2
+    pad_width = [(0, 0)] * (arr.ndim - 1) + [(pad + 1, window - pad - 1)]
+    cs = np.cumsum(np.pad(filled, pad_width), axis=-1)
+    cn = np.cumsum(np.pad(valid.astype(np.float64), pad_width), axis=-1)
+    sums = cs[..., window:] - cs[..., :-window]
+    counts = cn[..., window:] - cn[..., :-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+# ---------- Bandas normalizadas ----------
+def band_centers(fraction: int = 3, fmin: float = AUDIO_RANGE[0], fmax: float = AUDIO_RANGE[1]) -> np.ndarray:
+    """
+    Frecuencias centrales exactas de banda 1/fraction de octava (base 10):
+    fraction=1 → octavas (…, 500, 1000, 2000, …), fraction=3 → tercios.
+    """
+    if fraction not in (1, 3):
+        raise ValueError("fraction debe ser 1 (octava) o 3 (tercio de octava)")
+    step = 3.0 / (10.0 * fraction)  # décadas por banda
+    n_lo = int(np.floor(np.log10(fmin / REF_HZ) / step))
+    n_hi = int(np.ceil(np.log10(fmax / REF_HZ) / step))
+    centers = REF_HZ * 10.0 ** (np.arange(n_lo, n_hi + 1) * step)
+    return centers[(centers >= fmin * 0.99) & (centers <= fmax * 1.01)]
+
+
+def interpolate_to_bands(freq, thd, centers: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Interpola THD (1D o 2D) sobre 'centers' en escala log-frecuencia.
+    Fuera del rango medido devuelve NaN. Los NaN del barrido se ignoran.
+    Todo el lote a la vez: para cada centro se busca (searchsorted) la columna
+    medida anterior y, por fila, el punto válido anterior/siguiente con índices
+    propagados hacia adelante/atrás sobre los NaN.
+    """
+    f = to_float_array(freq)
+    y = to_float_array(thd)
+    if centers is None:
+        centers = band_centers(3)
+    logc = np.log10(centers)
+    out_shape = y.shape[:-1] + (centers.size,)
+    cols = np.flatnonzero(f > 0)
+    if cols.size < 2:
+        return np.full(out_shape, np.nan)
+    cols = cols[np.argsort(f[cols], kind="stable")]
+    lf = np.log10(f[cols])
+    rows = y.reshape(-1, y.shape[-1])[:, cols]
+    n = cols.size
+    valid = ~np.isnan(rows)
+    pos = np.arange(n)
+    # Último válido en o antes de cada columna / primero válido después (n = ninguno)
+    prev_valid = np.maximum.accumulate(np.where(valid, pos, -1), axis=-1)
+    next_valid = np.minimum.accumulate(np.where(valid, pos, n)[:, ::-1], axis=-1)[:, ::-1]
+    next_valid = np.concatenate([next_valid, np.full((rows.shape[0], 1), n)], axis=-1)
+
+    k = np.searchsorted(lf, logc, side="right") - 1  # última columna con lf <= centro
+    lo = np.where(k >= 0, prev_valid[:, np.maximum(k, 0)], -1)
+    hi = next_valid[:, k + 1]
+    lo_c, hi_c = np.maximum(lo, 0), np.minimum(hi, n - 1)
+    x_lo, x_hi = lf[lo_c], lf[hi_c]
+    y_lo = np.take_along_axis(rows, lo_c, axis=-1)
+    y_hi = np.take_along_axis(rows, hi_c, axis=-1)
+    exact = (lo >= 0) & (x_lo == logc)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        val = np.where(exact, y_lo, y_lo + (y_hi - y_lo) * (logc - x_lo) / (x_hi - x_lo))
+    ok = (exact | ((lo >= 0) & (hi < n))) & (valid.sum(axis=-1) >= 2)[:, None]
+    return np.where(ok, val, np.nan).reshape(out_shape)
+
+
+# ---------- Métricas ----------
+def band_averages(freq, thd, edges: Iterable[float] = (20.0, 200.0, 2000.0, 20000.0)) -> np.ndarray:
+    """
+    Promedio de THD por banda [edges[i], edges[i+1]) sobre el último eje.
+    Devuelve shape (..., len(edges) - 1); NaN si la banda no tiene datos.
+    """
+    f = to_float_array(freq)
+    y = to_float_array(thd)
+    edges = np.asarray(tuple(edges), dtype=np.float64)
+    nb = edges.size - 1
+    idx = np.digitize(f, edges) - 1  # banda de cada frecuencia
+    idx[f == edges[-1]] = nb - 1     # último borde inclusivo
+    valid = ~np.isnan(y)
+    filled = np.where(valid, y, 0.0)
+    out_shape = y.shape[:-1] + (nb,)
+    sums = np.zeros(out_shape)
+    counts = np.zeros(out_shape)
+    for b in range(nb):
+        sel = idx == b
+        sums[..., b] = filled[..., sel].sum(axis=-1)
+        counts[..., b] = valid[..., sel].sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def area_under_curve(freq, thd, log_freq: bool = True) -> np.ndarray:
+    """
+    Área bajo la curva THD (regla del trapecio) sobre el último eje.
+    Con log_freq=True integra en décadas (%·década), que pondera igual cada octava.
+    Los NaN (puntos sin lectura) se saltean: cada punto válido forma trapecio con
+    el válido anterior (índice propagado hacia adelante sobre el hueco), es decir,
+    los vecinos del hueco se unen con una recta ([1, nan, 3] en x = 0, 1, 2 da 4,
+    no 0). Con menos de 2 puntos válidos da 0.
+    """
+    f = to_float_array(freq)
+    y = to_float_array(thd)
+    x = np.log10(f) if log_freq else f
+    x, y = np.broadcast_arrays(x, y)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    pos = np.arange(y.shape[-1])
+    last = np.maximum.accumulate(np.where(valid, pos, -1), axis=-1)
+    # Válido anterior a cada posición (-1 si no hay)
+    prev = np.concatenate([np.full(last.shape[:-1] + (1,), -1), last[..., :-1]], axis=-1)
+    pair = valid & (prev >= 0)
+    prev = np.maximum(prev, 0)
+    x_prev = np.take_along_axis(x, prev, axis=-1)
+    y_prev = np.take_along_axis(y, prev, axis=-1)
+    with np.errstate(invalid="ignore"):
+        seg = np.where(pair, 0.5 * (y + y_prev) * (x - x_prev), 0.0)
+    return np.asarray(seg.sum(axis=-1))
+
+
+def summarize(freq, thd) -> Dict[str, np.ndarray]:
+    """
+    Métricas de un barrido (1D → escalares) o de un lote (2D → un valor por fila):
+      max_thd, freq_at_max, mean_thd, min_thd, valid_points, auc_log,
+      band_avg (bandas bajo/medio/alto: 20-200, 200-2k, 2k-20k Hz).
+    """
+    f = to_float_array(freq)
+    y = to_float_array(thd)
+    valid = ~np.isnan(y)
+    n_valid = valid.sum(axis=-1)
+    any_valid = n_valid > 0
+
+    safe_max = np.where(valid, y, -np.inf)
+    imax = np.argmax(safe_max, axis=-1)
+    max_thd = np.take_along_axis(safe_max, np.expand_dims(imax, -1), axis=-1)[..., 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_thd = np.where(any_valid, np.where(valid, y, 0.0).sum(axis=-1) / n_valid, np.nan)
+    min_thd = np.where(valid, y, np.inf).min(axis=-1)
+
+    return {
+        "max_thd": np.where(any_valid, max_thd, np.nan),
+        "freq_at_max": np.where(any_valid, f[imax], np.nan),
+        "mean_thd": mean_thd,
+        "min_thd": np.where(any_valid, min_thd, np.nan),
+        "valid_points": n_valid,
+        "auc_log": area_under_curve(f, y, log_freq=True),
+        "band_avg": band_averages(f, y),
+    }
+
+
+def format_summary(metrics: Dict[str, np.ndarray]) -> str:
+    """Texto corto (para el chat) de summarize() sobre un único barrido."""
+    lo, mid, hi = (float(v) for v in np.ravel(metrics["band_avg"])[:3])
+    return (
+        f"THD máx {float(metrics['max_thd']):.4f}% @ {float(metrics['freq_at_max']):.0f} Hz · "
+        f"media {float(metrics['mean_thd']):.4f}% · "
+        f"bandas 20-200/200-2k/2k-20k Hz: {lo:.4f}/{mid:.4f}/{hi:.4f}% · "
+        f"AUC {float(metrics['auc_log']):.4f} %·déc · puntos válidos {int(metrics['valid_points'])}"
+    )
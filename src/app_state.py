@@ -3,3 +3,6 @@ from typing import Any, Dict
 
 # Contenedor simple y compartido entre módulos
 serial_ref: Dict[str, Any] = {"svc": None}
+
+# API de streaming: hub de eventos (lo crea main.py) y cola de barridos (la registra graph.py)
+api_ref: Dict[str, Any] = {"hub": None, "jobs": None, "scheduler": None}
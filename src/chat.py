@@ -1,12 +1,16 @@
 import flet as ft
 from flet import Icons
 import asyncio
+import time
 from storage.data.message_storage_instance import message_store
+from storage.data.sweep_archive_instance import sweep_archive
+from storage.data.measurement_cache_instance import measurement_cache
 from serial_service import SerialService
+from ui_bridge import UiBridge
 from serial.tools import list_ports
 
 # ✅ Estado compartido global SerialService
-from app_state import serial_ref
+from app_state import serial_ref, api_ref
 
 # ===== Paleta oscura (estática) =====
 CARD_BG            = "#161B22"
@@ -21,9 +25,32 @@ BUBBLE_OTHER_TEXT  = "#E6EDF3"
 INPUT_BG           = CARD_BG
 
 DEFAULT_BAUDS = ["9600", "19200", "38400", "57600", "115200"]
+REPLAY_SPEEDS = [("1", "x1"), ("10", "x10"), ("100", "x100"), ("0", "Máx")]
+
+def message_bubble(msg: dict, with_time: bool = False) -> ft.Container:
+    """Burbuja de chat para un mensaje {'from', 'text'[, 'ts']}."""
+    is_user = msg["from"] == "user"
+    bubble_bg   = BUBBLE_USER_BG   if is_user else BUBBLE_OTHER_BG
+    text_color  = BUBBLE_USER_TEXT if is_user else BUBBLE_OTHER_TEXT
+    align = ft.alignment.center_right if is_user else ft.alignment.center_left
+    prefix = ""
+    if with_time and msg.get("ts"):
+        prefix = time.strftime("%Y-%m-%d %H:%M:%S ", time.localtime(msg["ts"]))
+    return ft.Container(
+        content=ft.Text(f'{prefix}[{msg["from"]}] {msg["text"]}', color=text_color),
+        bgcolor=bubble_bg,
+        padding=10,
+        margin=5,
+        border_radius=10,
+        alignment=align,
+        width=360,
+    )
+
 
 def chat_content(page: ft.Page):
-    ps = page.pubsub
+    # Los hilos de SerialService publican en el puente (cola acotada) y la UI
+    # lo drena por lotes desde su propio loop: sin carreras ni esperas en el lector.
+    bridge = UiBridge()
 
     # --- área de mensajes
     chat_display = ft.ListView(expand=True, spacing=10, auto_scroll=True)
@@ -32,26 +59,41 @@ def chat_content(page: ft.Page):
     def safe_update(ctrl: ft.Control):
         if ctrl.page: ctrl.update()
 
+    search_state = {"query": ""}
+
     def render_messages():
+        if search_state["query"]:
+            return  # mostrando resultados de búsqueda
+        chat_display.controls = [message_bubble(msg) for msg in message_store.get_messages()]
+        if chat_display.page: chat_display.update()
+
+    # --- búsqueda en el historial
+    def run_search(e=None):
+        query = (search_field.value or "").strip()
+        search_state["query"] = query
+        if not query:
+            render_messages()
+            return
+        t0 = time.perf_counter()
+        hits = message_store.search(query)
+        dt_ms = (time.perf_counter() - t0) * 1000
         chat_display.controls.clear()
-        for msg in message_store.get_messages():
-            is_user = msg["from"] == "user"
-            bubble_bg   = BUBBLE_USER_BG   if is_user else BUBBLE_OTHER_BG
-            text_color  = BUBBLE_USER_TEXT if is_user else BUBBLE_OTHER_TEXT
-            align = ft.alignment.center_right if is_user else ft.alignment.center_left
-            chat_display.controls.append(
-                ft.Container(
-                    content=ft.Text(f'[{msg["from"]}] {msg["text"]}', color=text_color),
-                    bgcolor=bubble_bg,
-                    padding=10,
-                    margin=5,
-                    border_radius=10,
-                    alignment=align,
-                    width=360,
-                )
-            )
+        chat_display.controls.append(
+            ft.Text(f"{len(hits)} resultado(s) para '{query}' ({dt_ms:.1f} ms)", size=12, color=TEXT_MUTED)
+        )
+        for msg in reversed(hits):
+            chat_display.controls.append(message_bubble(msg, with_time=True))
         if chat_display.page: chat_display.update()
 
+    def clear_search(e=None):
+        search_field.value = ""
+        if search_field.page: search_field.update()
+        search_state["query"] = ""
+        render_messages()
+
+    search_field = ft.TextField(hint_text="Buscar en el historial…", expand=True, dense=True,
+                                on_submit=run_search)
+
     # --- estilo
     def style_input(tf: ft.TextField):
         tf.bgcolor = INPUT_BG
@@ -69,6 +111,13 @@ def chat_content(page: ft.Page):
     # --- entrada de texto
     input_field = ft.TextField(hint_text="Escribe...", expand=True)
     style_input(input_field)
+    style_input(search_field)
+    search_row = ft.Row(
+        [search_field,
+         ft.IconButton(icon=Icons.SEARCH, tooltip="Buscar", on_click=run_search),
+         ft.IconButton(icon=Icons.CLEAR, tooltip="Volver al chat", on_click=clear_search)],
+        spacing=5,
+    )
 
     def send_message(e):
         text = input_field.value.strip()
@@ -118,24 +167,30 @@ def chat_content(page: ft.Page):
 
     refresh_btn = ft.IconButton(icon=Icons.REFRESH, tooltip="Actualizar puertos", on_click=refresh_ports)
 
-    def connect(e):
+    # --- Grabación / reproducción de sesiones
+    record_cb = ft.Checkbox(label="Grabar sesión", value=False)
+    speed_dd = ft.Dropdown(
+        label="Velocidad",
+        options=[ft.dropdown.Option(key=k, text=t) for k, t in REPLAY_SPEEDS],
+        value="1", width=120,
+    )
+    style_dropdown(speed_dd)
+
+    def open_service(status: str, **kwargs):
         if serial_ref["svc"] and serial_ref["svc"].is_running:
             page.snack_bar = ft.SnackBar(ft.Text("Ya hay una conexión activa."))
             page.snack_bar.open = True
             page.update()
             return
 
-        if not port_dd.value:
-            page.snack_bar = ft.SnackBar(ft.Text("Selecciona un puerto."))
-            page.snack_bar.open = True
-            page.update()
-            return
-
+        if record_cb.value:
+            kwargs["record_path"] = time.strftime("sesion_%Y%m%d_%H%M%S.trace")
         try:
-            svc = SerialService(port=port_dd.value, baudrate=int(baud_dd.value), pubsub=ps)
+            svc = SerialService(pubsub=bridge, archive=sweep_archive, event_hub=api_ref["hub"],
+                                cache=measurement_cache, **kwargs)
             svc.start()
             serial_ref["svc"] = svc   # ✅ publicar serial global
-            status_text.value = f"Serial: conectado a {port_dd.value} @ {baud_dd.value}"
+            status_text.value = status
             status_text.color = PRIMARY
             safe_update(status_text)
 
@@ -144,6 +199,26 @@ def chat_content(page: ft.Page):
             page.snack_bar.open = True
             page.update()
 
+    def connect(e):
+        if not port_dd.value:
+            page.snack_bar = ft.SnackBar(ft.Text("Selecciona un puerto."))
+            page.snack_bar.open = True
+            page.update()
+            return
+        open_service(f"Serial: conectado a {port_dd.value} @ {baud_dd.value}",
+                     port=port_dd.value, baudrate=int(baud_dd.value))
+
+    def on_trace_picked(e: ft.FilePickerResultEvent):
+        if not e.files:
+            return
+        path = e.files[0].path
+        speed = float(speed_dd.value or "1")
+        open_service(f"Serial: reproduciendo {path} (x{speed_dd.value if speed else 'máx'})",
+                     port="replay", replay_path=path, replay_speed=speed)
+
+    trace_picker = ft.FilePicker(on_result=on_trace_picked)
+    page.overlay.append(trace_picker)
+
     def disconnect(e):
         if serial_ref["svc"]:
             try: serial_ref["svc"].stop()
@@ -212,11 +287,15 @@ def chat_content(page: ft.Page):
     def start_read(e): 
         if serial_ref["svc"]: serial_ref["svc"].start_read()
 
+    def cancel_send(e):
+        if serial_ref["svc"]: serial_ref["svc"].cancel_send()
+
     actions_row = ft.Row(
         [
             ft.ElevatedButton("Enviar lote…", icon=Icons.LIST, on_click=open_batch_dialog),
             ft.ElevatedButton("Enviar archivo…", icon=Icons.UPLOAD_FILE,
                               on_click=lambda e: file_picker.pick_files(allow_multiple=False)),
+            ft.OutlinedButton("Cancelar envío", icon=Icons.CANCEL, on_click=cancel_send),
             ft.OutlinedButton("Detener lectura", icon=Icons.PAUSE, on_click=stop_read),
             ft.OutlinedButton("Reanudar lectura", icon=Icons.PLAY_ARROW, on_click=start_read),
         ],
@@ -228,20 +307,31 @@ def chat_content(page: ft.Page):
         wrap=True, spacing=10, alignment=ft.MainAxisAlignment.START,
     )
 
+    trace_row = ft.Row(
+        [
+            record_cb,
+            ft.OutlinedButton("Reproducir traza…", icon=Icons.REPLAY,
+                              on_click=lambda e: trace_picker.pick_files(allow_multiple=False)),
+            speed_dd,
+        ],
+        wrap=True, spacing=10, alignment=ft.MainAxisAlignment.START,
+    )
+
     chat_ui = ft.Column(
-        controls=[title, status_text, controls_row, actions_row, chat_display, input_row],
+        controls=[title, status_text, controls_row, trace_row, actions_row, search_row, chat_display, input_row],
         expand=True,
     )
 
     root = ft.Container(content=chat_ui, bgcolor=CARD_BG)
 
-    # PubSub
-    def on_pubsub_msg(data):
-        if isinstance(data, dict) and "from" in data and "text" in data:
-            message_store.add_message(data["from"], data["text"])
+    # Mensajes de los hilos serie → UI
+    def deliver_messages(batch):
+        message_store.add_messages(
+            [d for d in batch if isinstance(d, dict) and "from" in d and "text" in d]
+        )
 
     async def after_mount():
-        ps.subscribe(on_pubsub_msg)
+        page.run_task(bridge.pump, deliver_messages)
         message_store.subscribe(render_messages)
         render_messages()
         refresh_ports()
@@ -252,6 +342,7 @@ def chat_content(page: ft.Page):
         if serial_ref["svc"]:
             serial_ref["svc"].stop()
             serial_ref["svc"] = None
+        message_store.close()
 
     page.on_close = on_close
     return root
@@ -0,0 +1,139 @@
+# src/deadline_scheduler.py
+import sys
+import threading
+import time
+from typing import List, Optional
+
+# Event.wait en Windows despierta con la granularidad del timer (~15.6 ms): la
+# ventana fina tiene que cubrirla. Ahí time.sleep es de alta resolución desde
+# Python 3.11, así que la ventana se recorre con sleeps cortos y solo se hace
+# spin en el último medio milisegundo.
+DEFAULT_SPIN_WINDOW = 0.016 if sys.platform == "win32" else 0.002
+_HIRES_SLEEP = sys.platform != "win32" or sys.version_info >= (3, 11)
+_SPIN_TAIL = 0.0005
+
+
+class DeadlineScheduler:
+    """
+    Planificador de envíos sobre deadlines absolutos de time.monotonic().
+
+    En lugar de dormir 'interval' después de cada escritura (lo que suma el
+    tiempo de escritura/emisión en cada vuelta y acumula deriva), cada envío
+    tiene un deadline fijo: t0, t0 + interval, t0 + 2*interval, ...
+      - espera gruesa con Event.wait (cancelable)
+      - espera fina en los últimos 'spin_window' segundos (intervalos < 100 ms):
+        sleeps cortos de alta resolución y spin solo al final
+      - si se atrasa más de un período completo, se resincroniza (no hace ráfagas)
+      - registra período real vs objetivo y jitter
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        cancel_event: Optional[threading.Event] = None,
+        spin_window: Optional[float] = None,
+    ):
+        self.interval = max(0.0, float(interval))
+        self.cancel_event = cancel_event or threading.Event()
+        self.spin_window = max(0.0, float(DEFAULT_SPIN_WINDOW if spin_window is None else spin_window))
+
+        self._next_deadline: Optional[float] = None
+        self._ticks: List[float] = []      # instantes reales de cada envío
+        self._lateness: List[float] = []   # atraso respecto al deadline (s)
+        self._targets: List[float] = []    # período objetivo vigente en cada envío
+        self._resyncs = 0
+
+    # ---------- Control ----------
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def set_interval(self, interval: float):
+        """Cambia el período; aplica a partir del próximo deadline."""
+        self.interval = max(0.0, float(interval))
+
+    # ---------- Espera ----------
+    def wait_next(self) -> bool:
+        """
+        Bloquea hasta el próximo deadline y lo marca como cumplido.
+        Devuelve False si se canceló durante la espera.
+        """
+        now = time.monotonic()
+        if self._next_deadline is None:
+            # El primer envío sale inmediatamente
+            self._next_deadline = now
+        deadline = self._next_deadline
+
+        # Espera gruesa (cancelable)
+        remaining = deadline - now - self.spin_window
+        if remaining > 0 and self.cancel_event.wait(remaining):
+            return False
+        # Espera fina
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            if self.cancel_event.is_set():
+                return False
+            if _HIRES_SLEEP and left > _SPIN_TAIL:
+                time.sleep(left - _SPIN_TAIL)
+        if self.cancel_event.is_set():
+            return False
+
+        tick = time.monotonic()
+        self._ticks.append(tick)
+        self._lateness.append(tick - deadline)
+        self._targets.append(self.interval)
+
+        # Próximo deadline absoluto; si ya quedó atrás por más de un período, resincroniza.
+        # Con interval=0 no hay período: el próximo sale ya y no cuenta como resincronización.
+        nxt = deadline + self.interval
+        if self.interval <= 0:
+            nxt = tick
+        elif tick - nxt > self.interval:
+            nxt = tick + self.interval
+            self._resyncs += 1
+        self._next_deadline = nxt
+        return True
+
+    # ---------- Estadísticas ----------
+    def stats(self) -> dict:
+        """
+        Resumen de temporización:
+          target_period / actual_period (media de períodos reales), jitter (desvío
+          estándar de los períodos respecto al objetivo), atraso máximo y resincronizaciones.
+        """
+        n = len(self._ticks)
+        out = {
+            "sent": n,
+            "target_period": self.interval,
+            "actual_period": None,
+            "jitter": None,
+            "max_lateness": max(self._lateness) if self._lateness else None,
+            "resyncs": self._resyncs,
+        }
+        if n < 2:
+            return out
+
+        periods = [b - a for a, b in zip(self._ticks, self._ticks[1:])]
+        targets = self._targets[:-1]
+        errors = [p - t for p, t in zip(periods, targets)]
+        mean_err = sum(errors) / len(errors)
+        out["target_period"] = sum(targets) / len(targets)
+        out["actual_period"] = sum(periods) / len(periods)
+        out["jitter"] = (sum((e - mean_err) ** 2 for e in errors) / len(errors)) ** 0.5
+        return out
+
+    def summary(self) -> str:
+        """Texto corto para el chat."""
+        s = self.stats()
+        if s["actual_period"] is None:
+            return f"Temporización: {s['sent']} envío(s)."
+        return (
+            f"Temporización: período objetivo {s['target_period'] * 1000:.1f} ms, "
+            f"real {s['actual_period'] * 1000:.2f} ms, jitter {s['jitter'] * 1000:.2f} ms, "
+            f"atraso máx {s['max_lateness'] * 1000:.2f} ms, resincronizaciones {s['resyncs']}."
+        )
@@ -0,0 +1,72 @@
+# src/figure_worker.py
+import asyncio
+import threading
+from typing import Any, Callable, Optional
+
+
+class CoalescingWorker:
+    """
+    Ejecuta trabajos pesados (armar figuras Plotly, renderizarlas) fuera del
+    event loop de Flet, coalesciendo pedidos:
+      - request(...) puede llamarse desde cualquier hilo (on_resize, polling)
+      - solo se construye el último pedido pendiente; los intermedios se descartan
+      - si llega un pedido más nuevo mientras se construye, el resultado viejo
+        no se aplica (build obsoleto cancelado)
+
+    build(*args) corre en un hilo y devuelve un resultado; apply(result) también
+    corre en un hilo (incluye el control.update() de Flet, que es thread-safe).
+    """
+
+    def __init__(
+        self,
+        page,
+        build: Callable[..., Any],
+        apply: Callable[[Any], None],
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        self.page = page
+        self.build = build
+        self.apply = apply
+        self.on_error = on_error
+
+        self._lock = threading.Lock()
+        self._version = 0          # último pedido recibido
+        self._pending = None       # args del último pedido aún no tomado
+        self._running = False
+        self.applied_version = 0   # último pedido efectivamente aplicado
+        self.discarded = 0         # pedidos coalescidos o descartados por obsoletos
+
+    def request(self, *args):
+        """Pide un nuevo build con estos argumentos (reemplaza al pendiente)."""
+        with self._lock:
+            self._version += 1
+            if self._pending is not None:
+                self.discarded += 1
+            self._pending = (self._version, args)
+            if self._running:
+                return
+            self._running = True
+        self.page.run_task(self._run)
+
+    def _is_stale(self, version: int) -> bool:
+        with self._lock:
+            return version != self._version
+
+    async def _run(self):
+        while True:
+            with self._lock:
+                if self._pending is None:
+                    self._running = False
+                    return
+                version, args = self._pending
+                self._pending = None
+            try:
+                result = await asyncio.to_thread(self.build, *args)
+                if self._is_stale(version):
+                    self.discarded += 1
+                    continue
+                await asyncio.to_thread(self.apply, result)
+                self.applied_version = version
+            except Exception as ex:
+                if self.on_error:
+                    self.on_error(ex)
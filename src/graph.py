@@ -3,14 +3,22 @@ from flet.plotly_chart import PlotlyChart
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from uuid import uuid4
 import os
 import asyncio
 import time
+from datetime import datetime
+import numpy as np
+
+import analysis
+from limit_mask import LimitMask
+from figure_worker import CoalescingWorker
+from job_queue import JobQueue, JobScheduler
 
 # ✅ Compartir SerialService y mandar mensajes al chat
-from app_state import serial_ref
+from app_state import serial_ref, api_ref
 from storage.data.message_storage_instance import message_store
+from storage.data.sweep_archive_instance import sweep_archive
+from serial_service import SerialService
 from flet import Icons
 
 # ===== Paleta oscura =====
@@ -21,9 +29,151 @@ TEXT_MUTED    = "#9BA8B3"
 PRIMARY       = "#3B82F6"
 GRID_COLOR    = "#30363D"
 HOVER_BG      = "#1F242D"
+CACHED_COLOR  = "#F59E0B"
 
 CSV_PATH = "thd_data.csv"
+JOBS_PATH = "jobs.json"
 POLL_SECS = 1.0
+HISTORY_MAX = 200  # barridos listados en el selector de historial
+
+# ---------- Figuras (nivel módulo: se arman fuera del event loop) ----------
+def make_empty_figure(width: int, height: int, msg: str) -> go.Figure:
+    fig = go.Figure()
+    fig.update_layout(
+        autosize=False, width=width, height=height,
+        margin=dict(l=20, r=20, t=50, b=20),
+        paper_bgcolor=CARD_BG, plot_bgcolor=CARD_BG,
+        font=dict(color=TEXT_PRIMARY),
+        title=dict(text="THD vs Frecuencia", font=dict(color=TEXT_PRIMARY)),
+    )
+    axis_common = dict(
+        showgrid=True, gridcolor=GRID_COLOR, zeroline=False,
+        linecolor=CARD_BORDER, tickfont=dict(color=TEXT_MUTED)
+    )
+    fig.update_xaxes(**axis_common, title=dict(text="Frecuencia (Hz)", font=dict(color=TEXT_PRIMARY)))
+    fig.update_yaxes(**axis_common, title=dict(text="THD (%)",        font=dict(color=TEXT_PRIMARY)))
+    fig.add_annotation(text=msg, showarrow=False, font=dict(color=TEXT_MUTED, size=14),
+                       xref="paper", yref="paper", x=0.5, y=0.5)
+    fig.update_layout(hoverlabel=dict(bgcolor=HOVER_BG, bordercolor=CARD_BORDER,
+                                      font=dict(color=TEXT_PRIMARY)))
+    return fig
+
+def sweep_arrays(df: pd.DataFrame | None) -> tuple:
+    """
+    Extrae (freq, thd, mensaje) del DataFrame sin copiarlo.
+    Si no hay datos graficables, freq/thd son None y mensaje explica por qué.
+    Los puntos sin lectura (THD vacío/NaN) se conservan como NaN para que el
+    gráfico muestre un hueco en lugar de unir los vecinos o dibujar un cero.
+    """
+    if df is None or df.empty or not set(["Frecuencia", "THD"]).issubset(df.columns):
+        return None, None, "Esperando archivo 'thd_data.csv'…"
+    try:
+        # Sin copia del DataFrame: normalización vectorizada sobre las columnas
+        freq = analysis.to_float_array(df["Frecuencia"].to_numpy())
+        thd = analysis.to_float_array(df["THD"].to_numpy())
+        if np.isnan(thd).all():
+            return None, None, "Sin datos válidos en el CSV."
+        ok = ~np.isnan(freq)
+        if not ok.all():
+            freq, thd = freq[ok], thd[ok]
+        return freq, thd, ""
+    except:
+        return None, None, "Error leyendo datos del CSV."
+
+
+def cached_points(df: pd.DataFrame | None) -> tuple:
+    """(freq, thd) de los puntos reutilizados de la caché (columna 'Origen'), o vacíos."""
+    if df is None or df.empty or "Origen" not in df.columns:
+        return [], []
+    m = (df["Origen"] == SerialService.SOURCE_CACHE).to_numpy()
+    if not m.any():
+        return [], []
+    freq = analysis.to_float_array(df["Frecuencia"].to_numpy()[m])
+    thd = analysis.to_float_array(df["THD"].to_numpy()[m])
+    return freq, thd
+
+
+def _cached_trace(x=(), y=()) -> go.Scatter:
+    return go.Scatter(x=list(x), y=list(y), mode="markers", name="Caché",
+                      marker=dict(size=10, color=CACHED_COLOR, symbol="circle-open", line=dict(width=2)))
+
+
+def style_figure(fig: go.Figure, width: int, height: int) -> go.Figure:
+    fig.update_traces(line=dict(width=2, color=PRIMARY), marker=dict(size=6, color=PRIMARY))
+    fig.update_layout(
+        autosize=False, width=width, height=height,
+        margin=dict(l=20, r=20, t=50, b=20),
+        xaxis_title="Frecuencia (Hz)", yaxis_title="THD (%)",
+        hovermode="x unified",
+        paper_bgcolor=CARD_BG, plot_bgcolor=CARD_BG,
+        font=dict(color=TEXT_PRIMARY), title=dict(text="THD vs Frecuencia", font=dict(color=TEXT_PRIMARY)),
+        colorway=[PRIMARY],
+    )
+    axis_common = dict(showgrid=True, gridcolor=GRID_COLOR, zeroline=False,
+                       linecolor=CARD_BORDER, tickfont=dict(color=TEXT_MUTED))
+    fig.update_xaxes(**axis_common)
+    fig.update_yaxes(**axis_common)
+    fig.update_layout(hoverlabel=dict(bgcolor=HOVER_BG, bordercolor=CARD_BORDER,
+                                      font=dict(color=TEXT_PRIMARY)))
+    return fig
+
+
+def create_figure(df: pd.DataFrame | None, width: int, height: int) -> go.Figure:
+    """Arma una figura nueva THD vs Frecuencia (puro cálculo, apto para correr en un hilo)."""
+    freq, thd, msg = sweep_arrays(df)
+    if freq is None:
+        return make_empty_figure(width, height, msg)
+    fig = px.line(x=freq, y=thd, title="THD vs Frecuencia", markers=True)
+    fig.update_traces(connectgaps=False)
+    style_figure(fig, width, height)
+    cx, cy = cached_points(df)
+    if len(cx):
+        fig.add_trace(_cached_trace(cx, cy))
+    return fig
+
+
+class LiveThdFigure:
+    """
+    Figura persistente del panel: se crea una sola vez y los cambios de datos
+    o de tamaño se aplican en sitio (x/y de la traza, width/height del layout)
+    en lugar de rearmar px.line y un PlotlyChart nuevo en cada actualización.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.fig = make_empty_figure(width, height, "Esperando archivo 'thd_data.csv'…")
+        self.fig.add_trace(go.Scatter(x=[], y=[], mode="lines+markers", name="THD", connectgaps=False))
+        style_figure(self.fig, width, height)
+        self.fig.add_trace(_cached_trace())  # puntos reutilizados de la caché
+        self._data_version = None
+        self._size = (width, height)
+
+    @property
+    def state_key(self) -> tuple:
+        """Identifica lo que muestra la figura (versión de datos + tamaño)."""
+        return (self._data_version, self._size)
+
+    def set_size(self, width: int, height: int):
+        if (width, height) != self._size:
+            self.fig.update_layout(width=width, height=height)
+            self._size = (width, height)
+
+    def set_data(self, df: pd.DataFrame | None, version):
+        if version == self._data_version:
+            return
+        freq, thd, msg = sweep_arrays(df)
+        with self.fig.batch_update():
+            trace = self.fig.data[0]
+            if freq is None:
+                trace.x, trace.y = [], []
+            else:
+                trace.x, trace.y = freq, thd
+            cached = self.fig.data[1]
+            cached.x, cached.y = cached_points(df) if freq is not None else ([], [])
+            annotation = self.fig.layout.annotations[0]
+            annotation.text = msg
+            annotation.visible = freq is None
+        self._data_version = version
+
 
 def graph_content(page: ft.Page):
     page.scroll = None
@@ -56,6 +206,42 @@ def graph_content(page: ft.Page):
 
     running_seq = {"flag": False}
 
+    # ---------- Máscara de límites (pasa/no-pasa) ----------
+    mask_state = {"mask": None}
+    mask_text = ft.Text("Sin máscara", size=12, color=TEXT_MUTED)
+    abort_cb = ft.Checkbox(label="Abortar en falla", value=False)
+    dut_tf = ft.TextField(label="DUT", width=140, hint_text="ID del equipo")
+    style_textfield(dut_tf)
+    cache_cb = ft.Checkbox(label="Usar caché", value=False,
+                           tooltip="Reutiliza puntos frescos del mismo DUT y configuración")
+    defer_cb = ft.Checkbox(label="Diferir fallas", value=False,
+                           tooltip="Marca NaN y sigue; re-mide los puntos faltantes al final")
+
+    def on_mask_picked(e: ft.FilePickerResultEvent):
+        if not e.files:
+            return
+        path = e.files[0].path
+        try:
+            mask_state["mask"] = LimitMask.from_csv(path)
+            mask_text.value = f"Máscara: {os.path.basename(path)}"
+            mask_text.color = PRIMARY
+            message_store.add_message("system", f"Máscara de límites cargada: {path}")
+        except Exception as ex:
+            mask_state["mask"] = None
+            mask_text.value = "Sin máscara"
+            mask_text.color = TEXT_MUTED
+            message_store.add_message("system", f"Error cargando máscara: {ex}")
+        if mask_text.page: mask_text.update()
+
+    def clear_mask(e):
+        mask_state["mask"] = None
+        mask_text.value = "Sin máscara"
+        mask_text.color = TEXT_MUTED
+        if mask_text.page: mask_text.update()
+
+    mask_picker = ft.FilePicker(on_result=on_mask_picked)
+    page.overlay.append(mask_picker)
+
     def run_sequence_clicked(e):
         if running_seq["flag"]:
             return
@@ -86,15 +272,21 @@ def graph_content(page: ft.Page):
 
             values = await asyncio.to_thread(
                 serial_ref["svc"].run_measurement_sequence,
-                repeats, delay_s
+                repeats, delay_s,
+                limit_mask=mask_state["mask"],
+                abort_on_fail=bool(abort_cb.value),
+                defer_failed=bool(defer_cb.value),
+                dut_id=(dut_tf.value or "").strip(),
+                use_cache=bool(cache_cb.value),
             )
 
             if values:
                 message_store.add_message("system", f"RL lecturas: {values}")
                 try:
-                    avg = sum(values) / len(values)
-                    message_store.add_message("system", f"Promedio RL: {avg:.6f}")
-                except:
+                    freqs = 1000.0 + 1000.0 * np.arange(len(values))
+                    metrics = analysis.summarize(freqs, np.asarray(values, dtype=np.float64))
+                    message_store.add_message("system", analysis.format_summary(metrics))
+                except Exception:
                     pass
             else:
                 message_store.add_message("system", "No se obtuvieron lecturas RL (lista vacía).")
@@ -109,98 +301,192 @@ def graph_content(page: ft.Page):
 
     seq_btn = ft.ElevatedButton("Secuencia RL", icon=Icons.ANALYTICS, on_click=run_sequence_clicked)
 
+    # ---------- Cola de barridos (desatendida, persistente) ----------
+    def service_for(instrument: str):
+        svc = serial_ref["svc"]
+        if svc is None or not svc.is_running:
+            return None
+        return svc if not instrument or svc.port == instrument else None
+
+    queue_text = ft.Text("", size=12, color=TEXT_MUTED)
+
+    def on_queue_progress(status: dict):
+        queue_text.value = scheduler.summary()
+        queue_text.color = PRIMARY if status["running"] else TEXT_MUTED
+        if queue_text.page: queue_text.update()
+        if api_ref["hub"] is not None:
+            api_ref["hub"].publish("queue", status)
+
+    job_queue = JobQueue(JOBS_PATH)
+    scheduler = JobScheduler(job_queue, service_for, on_progress=on_queue_progress)
+    queue_text.value = scheduler.summary()
+    api_ref["jobs"] = job_queue
+    api_ref["scheduler"] = scheduler
+
+    priority_tf = ft.TextField(label="Prioridad", value="0", width=100)
+    output_tf = ft.TextField(label="Salida CSV", value=CSV_PATH, width=180)
+    for tf in (priority_tf, output_tf):
+        style_textfield(tf)
+
+    def enqueue_clicked(e):
+        try:
+            repeats = int((repeats_tf.value or "10").strip())
+            delay_s = float((delay_seq_tf.value or "0.5").strip())
+            priority = int((priority_tf.value or "0").strip())
+        except ValueError:
+            page.snack_bar = ft.SnackBar(ft.Text("Repeticiones, delay y prioridad deben ser numéricos."))
+            page.snack_bar.open = True
+            page.update()
+            return
+        svc = serial_ref["svc"]
+        job_id = job_queue.add(
+            {"repeats": repeats, "delay": delay_s, "defer_failed": bool(defer_cb.value),
+             "dut": (dut_tf.value or "").strip(), "use_cache": bool(cache_cb.value)},
+            instrument=svc.port if svc else "",
+            priority=priority,
+            output=(output_tf.value or CSV_PATH).strip(),
+        )
+        message_store.add_message("system", f"Barrido encolado: trabajo #{job_id} (reps={repeats}, delay={delay_s}s).")
+        on_queue_progress(scheduler.status())
+
+    def toggle_queue(e):
+        if scheduler.active:
+            scheduler.stop()
+            queue_btn.text, queue_btn.icon = "Iniciar cola", Icons.PLAY_ARROW
+        else:
+            scheduler.start()
+            queue_btn.text, queue_btn.icon = "Pausar cola", Icons.PAUSE
+        queue_btn.update()
+
+    queue_btn = ft.OutlinedButton("Iniciar cola", icon=Icons.PLAY_ARROW, on_click=toggle_queue)
+    # Desatendida: tras un reinicio la cola sigue sola salvo que se haya pausado
+    scheduler.resume()
+    if scheduler.active:
+        queue_btn.text, queue_btn.icon = "Pausar cola", Icons.PAUSE
+    queue_row = ft.Row(
+        controls=[
+            priority_tf, output_tf,
+            ft.ElevatedButton("Encolar", icon=Icons.QUEUE, on_click=enqueue_clicked),
+            queue_btn,
+            ft.IconButton(icon=Icons.CLEAR_ALL, tooltip="Quitar terminados",
+                          on_click=lambda e: (job_queue.clear_finished(), on_queue_progress(scheduler.status()))),
+            queue_text,
+        ],
+        wrap=True, spacing=10, alignment=ft.MainAxisAlignment.CENTER,
+    )
+
     rl_row = ft.Row(
-        controls=[repeats_tf, delay_seq_tf, seq_btn],
+        controls=[repeats_tf, delay_seq_tf, dut_tf, cache_cb, defer_cb, seq_btn],
         wrap=True, spacing=20, alignment=ft.MainAxisAlignment.CENTER,
     )
 
+    mask_row = ft.Row(
+        controls=[
+            ft.OutlinedButton("Máscara…", icon=Icons.RULE,
+                              on_click=lambda e: mask_picker.pick_files(allow_multiple=False,
+                                                                        allowed_extensions=["csv"])),
+            ft.IconButton(icon=Icons.CLEAR, tooltip="Quitar máscara", on_click=clear_mask),
+            mask_text, abort_cb,
+        ],
+        wrap=True, spacing=10, alignment=ft.MainAxisAlignment.CENTER,
+    )
+
     # ---------- Gráfico ----------
     chart_container = ft.Container(alignment=ft.alignment.center, expand=True)
     title = ft.Text("Configuración de Barrido en Frecuencia",
                     style=ft.TextThemeStyle.TITLE_MEDIUM, color=TEXT_PRIMARY)
 
-    def make_empty_figure(width: int, height: int, msg: str) -> go.Figure:
-        fig = go.Figure()
-        fig.update_layout(
-            autosize=False, width=width, height=height,
-            margin=dict(l=20, r=20, t=50, b=20),
-            paper_bgcolor=CARD_BG, plot_bgcolor=CARD_BG,
-            font=dict(color=TEXT_PRIMARY),
-            title=dict(text="THD vs Frecuencia", font=dict(color=TEXT_PRIMARY)),
-        )
-        axis_common = dict(
-            showgrid=True, gridcolor=GRID_COLOR, zeroline=False,
-            linecolor=CARD_BORDER, tickfont=dict(color=TEXT_MUTED)
-        )
-        fig.update_xaxes(**axis_common, title=dict(text="Frecuencia (Hz)", font=dict(color=TEXT_PRIMARY)))
-        fig.update_yaxes(**axis_common, title=dict(text="THD (%)",        font=dict(color=TEXT_PRIMARY)))
-        fig.add_annotation(text=msg, showarrow=False, font=dict(color=TEXT_MUTED, size=14),
-                           xref="paper", yref="paper", x=0.5, y=0.5)
-        fig.update_layout(hoverlabel=dict(bgcolor=HOVER_BG, bordercolor=CARD_BORDER,
-                                          font=dict(color=TEXT_PRIMARY)))
-        return fig
-
-    def create_figure(df: pd.DataFrame | None, width: int, height: int):
-        if df is None or df.empty or not set(["Frecuencia", "THD"]).issubset(df.columns):
-            return make_empty_figure(width, height, "Esperando archivo 'thd_data.csv'…")
+    # Gráfico persistente: una sola figura y un solo PlotlyChart (isolated, así
+    # su update no re-serializa el resto del panel). Datos y tamaño se aplican
+    # en sitio; si nada cambió desde el último render, no se envía nada.
+    live_fig = LiveThdFigure(max(int((page.width or 600) // 2), 300),
+                             max(int((page.height or 480) - 180), 300))
+    chart = PlotlyChart(live_fig.fig, isolated=True)
+    chart_container.content = chart
+    rendered = {"key": None}
 
-        try:
-            df_plot = df.copy()
-            df_plot["THD"] = pd.to_numeric(df_plot["THD"].astype(str).str.replace(",", "."), errors="coerce")
-            df_plot = df_plot.dropna(subset=["Frecuencia", "THD"])
-            if df_plot.empty:
-                return make_empty_figure(width, height, "Sin datos válidos en el CSV.")
-        except:
-            return make_empty_figure(width, height, "Error leyendo datos del CSV.")
-
-        fig = px.line(df_plot, x="Frecuencia", y="THD", title="THD vs Frecuencia", markers=True)
-        fig.update_traces(line=dict(width=2, color=PRIMARY), marker=dict(size=6, color=PRIMARY))
-        fig.update_layout(
-            autosize=False, width=width, height=height,
-            margin=dict(l=20, r=20, t=50, b=20),
-            xaxis_title="Frecuencia (Hz)", yaxis_title="THD (%)",
-            hovermode="x unified",
-            paper_bgcolor=CARD_BG, plot_bgcolor=CARD_BG,
-            font=dict(color=TEXT_PRIMARY), title=dict(font=dict(color=TEXT_PRIMARY)),
-            colorway=[PRIMARY],
-        )
-        axis_common = dict(showgrid=True, gridcolor=GRID_COLOR, zeroline=False,
-                           linecolor=CARD_BORDER, tickfont=dict(color=TEXT_MUTED))
-        fig.update_xaxes(**axis_common)
-        fig.update_yaxes(**axis_common)
-        fig.update_layout(hoverlabel=dict(bgcolor=HOVER_BG, bordercolor=CARD_BORDER,
-                                          font=dict(color=TEXT_PRIMARY)))
-        return fig
+    # Armado y render del gráfico en un hilo: pedidos coalescidos (solo el último
+    # tamaño / versión de datos) y builds obsoletos descartados.
+    def build_chart(df: pd.DataFrame | None, version, ancho: int, alto: int):
+        live_fig.set_size(ancho, alto)
+        live_fig.set_data(df, version)
+        return live_fig.state_key
 
-    def update_chart(df: pd.DataFrame | None):
-        ancho = max(int(page.width // 2), 300)
-        alto = max(int(page.height - 180), 300)
-        fig = create_figure(df, ancho, alto)
-        chart_container.content = PlotlyChart(fig, key=str(uuid4()))
-        if chart_container.page: chart_container.update()
+    def apply_chart(key: tuple):
+        if key == rendered["key"] or not chart.page:
+            return
+        chart.update()
+        rendered["key"] = key
 
-    # Primer render
-    update_chart(None)
+    chart_worker = CoalescingWorker(
+        page, build_chart, apply_chart,
+        on_error=lambda ex: print(f"Error armando gráfico: {ex}"),
+    )
+
+    # ---------- Polling CSV ----------
+    state = {"df": None, "mtime": None, "version": 0, "live": True}
+
+    def update_chart(df: pd.DataFrame | None):
+        if df is not state["df"]:
+            state["df"] = df
+            state["version"] += 1
+        ancho = max(int((page.width or 600) // 2), 300)
+        alto = max(int((page.height or 480) - 180), 300)
+        chart_worker.request(df, state["version"], ancho, alto)
 
     page.on_resize = lambda e: update_chart(state["df"])
 
-    # ---------- Polling CSV ----------
-    state = {"df": None, "mtime": None}
+    # ---------- Historial (SweepArchive) ----------
+    history_dd = ft.Dropdown(label="Historial", width=300, value="live",
+                             options=[ft.dropdown.Option(key="live", text="En vivo (thd_data.csv)")])
+    history_dd.bgcolor = CARD_BG
+    history_dd.color = TEXT_PRIMARY
+    history_dd.border_color = CARD_BORDER
+    history_dd.focused_border_color = PRIMARY
+
+    def refresh_history(e=None):
+        opts = [ft.dropdown.Option(key="live", text="En vivo (thd_data.csv)")]
+        for sw in reversed(sweep_archive.sweeps()[-HISTORY_MAX:]):
+            when = datetime.fromtimestamp(sw["t_start"]).strftime("%Y-%m-%d %H:%M")
+            opts.append(ft.dropdown.Option(key=str(sw["sweep"]),
+                                           text=f"#{sw['sweep']}  {when}  ({sw['rows']} pts)"))
+        history_dd.options = opts
+        if history_dd.page: history_dd.update()
+
+    def on_history_change(e):
+        if history_dd.value in (None, "live"):
+            state["live"] = True
+            state["mtime"] = None  # fuerza relectura del CSV en el próximo poll
+            return
+        state["live"] = False
+        try:
+            data = sweep_archive.read_sweep(int(history_dd.value))
+            update_chart(pd.DataFrame({"Frecuencia": data["freq"], "THD": data["thd"]}))
+        except Exception as ex:
+            message_store.add_message("system", f"Error leyendo historial: {ex}")
+
+    history_dd.on_change = on_history_change
+    history_row = ft.Row(
+        controls=[history_dd,
+                  ft.IconButton(icon=Icons.REFRESH, tooltip="Actualizar historial", on_click=refresh_history)],
+        wrap=True, spacing=10, alignment=ft.MainAxisAlignment.CENTER,
+    )
+    refresh_history()
 
     async def poll_csv():
         while True:
             try:
-                if os.path.exists(CSV_PATH):
+                if not state["live"]:
+                    pass
+                elif os.path.exists(CSV_PATH):
                     mtime = os.path.getmtime(CSV_PATH)
                     if state["mtime"] is None or mtime != state["mtime"]:
                         await asyncio.sleep(0.05)
-                        new_df = pd.read_csv(CSV_PATH)
-                        state["df"] = new_df
+                        new_df = await asyncio.to_thread(pd.read_csv, CSV_PATH)
                         state["mtime"] = mtime
-                        update_chart(state["df"])
+                        update_chart(new_df)
                 else:
                     if state["df"] is not None or state["mtime"] is not None:
-                        state["df"] = None
                         state["mtime"] = None
                         update_chart(None)
             except:
@@ -212,7 +498,7 @@ def graph_content(page: ft.Page):
     root = ft.Container(
         bgcolor=CARD_BG,
         content=ft.Column(
-            controls=[title, controls_row, rl_row, chart_container],
+            controls=[title, controls_row, rl_row, queue_row, mask_row, history_row, chart_container],
             expand=True,
         ),
     )
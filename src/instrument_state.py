@@ -0,0 +1,113 @@
+# src/instrument_state.py
+import re
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+# Línea que imprime el Arduino al arrancar: el analizador detrás quedó en estado desconocido
+FIRMWARE_BANNER = "ARDUINO GPIB firmware"
+# Errores del firmware al hablar con el bus: el último ajuste pudo no llegar al analizador
+FIRMWARE_ERRORS = ("timeout waiting NDAC", "gpib write failed", "set_comm-cntx failed")
+
+# Tipos de comando
+RESET = "reset"      # CLR: vuelve el analizador a sus valores por defecto
+SETTING = "ajuste"   # cambia una configuración que persiste (AP, FR, FN, SP, P, O, S)
+QUERY = "consulta"   # no cambia nada (RL)
+STEP = "paso"        # UP/DN: mueven la frecuencia
+UNKNOWN = "desconocido"
+
+_SETTING_CODES = ("AP", "FR", "FN", "P", "O", "S")
+_CODE_ARGS = re.compile(r"^([A-Z]+)(.+)$")     # AP1.0VL, FR1.0KZ, P2, S3
+_ARGS_CODE = re.compile(r"^([-+\d.]+)([A-Z]+)$")  # 34.0SP (función especial)
+
+
+class InstrumentState:
+    """
+    Modelo de la configuración actual del analizador, armado con cada comando enviado.
+
+    plan(comandos) devuelve solo lo que cambia algo respecto del modelo: los
+    ajustes con el mismo valor se omiten y CLR también, si todo lo conocido
+    desde el último CLR lo vuelve a fijar la secuencia. Cualquier comando que
+    no se sabe interpretar invalida el modelo (se vuelve a mandar todo), igual
+    que reconectar, ver el banner del firmware o un error del bus GPIB
+    (invalidate()).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._settings: dict = {}
+        self._baseline = False  # True tras un CLR visto: el resto está en _settings
+        self.skipped = 0
+
+    @staticmethod
+    def parse(cmd: str) -> Tuple[str, Optional[str], Optional[str]]:
+        """(tipo, clave, valor) de un comando; mayúsculas y espacios no importan."""
+        norm = "".join(str(cmd).upper().split())
+        if not norm:
+            return QUERY, None, None
+        if norm == "CLR":
+            return RESET, None, None
+        if norm == "RL":
+            return QUERY, None, None
+        if norm in ("UP", "DN"):
+            return STEP, "FR", None
+        m = _ARGS_CODE.match(norm)
+        if m and m.group(2) == "SP":
+            # Cada función especial es independiente: la clave es el comando entero
+            return SETTING, norm, norm
+        m = _CODE_ARGS.match(norm)
+        if m and m.group(1) in _SETTING_CODES:
+            return SETTING, m.group(1), m.group(2)
+        return UNKNOWN, None, None
+
+    @property
+    def known(self) -> bool:
+        with self._lock:
+            return self._baseline
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._settings)
+
+    def observe(self, cmd: str):
+        """Actualiza el modelo con un comando efectivamente enviado."""
+        kind, key, value = self.parse(cmd)
+        with self._lock:
+            if kind == RESET:
+                self._settings = {}
+                self._baseline = True
+            elif kind == SETTING:
+                self._settings[key] = value
+            elif kind == STEP:
+                self._settings.pop(key, None)
+            elif kind == UNKNOWN:
+                self._settings = {}
+                self._baseline = False
+
+    def invalidate(self) -> bool:
+        """Olvida el modelo; devuelve True si había algo conocido."""
+        with self._lock:
+            had = self._baseline or bool(self._settings)
+            self._settings = {}
+            self._baseline = False
+        return had
+
+    def plan(self, commands: Iterable[str]) -> List[str]:
+        """Comandos de 'commands' que hace falta enviar dado el estado conocido."""
+        commands = list(commands)
+        parsed = [self.parse(c) for c in commands]
+        with self._lock:
+            if not self._baseline:
+                return commands
+            targets = {key: value for kind, key, value in parsed if kind == SETTING}
+            # Omitir CLR solo si la secuencia vuelve a fijar todo lo conocido
+            if not set(self._settings) <= set(targets):
+                return commands
+            out = []
+            for cmd, (kind, key, value) in zip(commands, parsed):
+                if kind == RESET:
+                    continue
+                if kind == SETTING and self._settings.get(key) == value:
+                    continue
+                out.append(cmd)
+            self.skipped += len(commands) - len(out)
+        return out
@@ -0,0 +1,278 @@
+# src/job_queue.py
+import json
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+# Estados de un trabajo
+PENDING = "pendiente"
+RUNNING = "en curso"
+DONE = "terminado"
+FAILED = "fallido"
+CANCELLED = "cancelado"
+
+DEFAULT_PLAN = {"repeats": 10, "delay": 0.5, "start_hz": 1000, "step_hz": 1000}
+
+
+class JobQueue:
+    """
+    Cola persistente de barridos (jobs.json).
+
+    Cada trabajo es un dict:
+      id, plan (repeats, delay, start_hz, step_hz; opcionales defer_failed, dut, use_cache),
+      instrument (puerto; "" = cualquiera),
+      priority (mayor = antes), output (CSV destino), status, created/started/finished,
+      points_done, points_total, error.
+    Se guarda entero en cada cambio (escritura atómica: tmp + os.replace) junto
+    con 'paused' (si el usuario pausó la cola). Al cargar, los trabajos que
+    quedaron 'en curso' por un cierre vuelven a pendiente.
+    """
+
+    def __init__(self, path: str = "jobs.json"):
+        self.path = path
+        self._lock = threading.RLock()
+        self._jobs: List[dict] = []
+        self.paused = False
+        self._load()
+
+    # ---------- Persistencia ----------
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, list):  # formato anterior: solo la lista de trabajos
+                data = {"jobs": data}
+            self._jobs = data.get("jobs", [])
+            self.paused = bool(data.get("paused", False))
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Error leyendo {self.path}: {e}")
+            self._jobs = []
+        for job in self._jobs:
+            if job["status"] == RUNNING:
+                job["status"] = PENDING
+                job["points_done"] = 0
+        self._save()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"paused": self.paused, "jobs": self._jobs}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    # ---------- Operaciones ----------
+    def add(self, plan: dict, instrument: str = "", priority: int = 0, output: str = "thd_data.csv") -> int:
+        """Encola un barrido y devuelve su id."""
+        plan = {**DEFAULT_PLAN, **(plan or {})}
+        with self._lock:
+            job_id = max((j["id"] for j in self._jobs), default=0) + 1
+            self._jobs.append({
+                "id": job_id,
+                "plan": plan,
+                "instrument": instrument or "",
+                "priority": int(priority),
+                "output": output,
+                "status": PENDING,
+                "created": time.time(),
+                "started": None,
+                "finished": None,
+                "points_done": 0,
+                "points_total": int(plan["repeats"]) + 1,
+                "error": "",
+            })
+            self._save()
+        return job_id
+
+    def set_paused(self, paused: bool):
+        with self._lock:
+            self.paused = bool(paused)
+            self._save()
+
+    def jobs(self) -> List[dict]:
+        with self._lock:
+            return [dict(j) for j in self._jobs]
+
+    def pending(self) -> List[dict]:
+        """Pendientes en orden de ejecución: prioridad desc, luego antigüedad."""
+        with self._lock:
+            jobs = [dict(j) for j in self._jobs if j["status"] == PENDING]
+        return sorted(jobs, key=lambda j: (-j["priority"], j["created"]))
+
+    def update(self, job_id: int, **fields):
+        with self._lock:
+            for job in self._jobs:
+                if job["id"] == job_id:
+                    job.update(fields)
+                    self._save()
+                    return
+
+    def cancel(self, job_id: int):
+        with self._lock:
+            for job in self._jobs:
+                if job["id"] == job_id and job["status"] == PENDING:
+                    job["status"] = CANCELLED
+                    self._save()
+                    return
+
+    def clear_finished(self):
+        with self._lock:
+            self._jobs = [j for j in self._jobs if j["status"] in (PENDING, RUNNING)]
+            self._save()
+
+
+class JobScheduler:
+    """
+    Ejecuta los trabajos de una JobQueue uno detrás de otro, sin tiempos muertos.
+
+    get_service(instrument) devuelve el SerialService a usar (o None si ese
+    instrumento no está conectado: el trabajo espera). El ETA se calcula con el
+    tiempo por punto medido (media móvil exponencial).
+    on_progress(status: dict) se llama desde el hilo del scheduler.
+    start()/stop() guardan el estado en la cola: tras reiniciar la app, si no
+    estaba pausada, vuelve a arrancar sola (resume()).
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        get_service: Callable[[str], object],
+        on_progress: Optional[Callable[[dict], None]] = None,
+        idle_poll: float = 1.0,
+    ):
+        self.queue = queue
+        self.get_service = get_service
+        self.on_progress = on_progress
+        self.idle_poll = idle_poll
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._state_lock = threading.Lock()
+        self.current: Optional[dict] = None
+        self.per_point_s: Optional[float] = None
+        self._last_point_t: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        """Hilo vivo (puede estar terminando el trabajo en curso tras stop())."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def active(self) -> bool:
+        """Tomando trabajos: corriendo y sin pausa pedida."""
+        return self.running and not self._stop.is_set()
+
+    def start(self):
+        self.queue.set_paused(False)
+        with self._state_lock:
+            self._stop.clear()
+            # Si el hilo sigue vivo (pausa pedida pero sin terminar), basta con quitar la pausa
+            if not self.running:
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+        self._report()
+
+    def stop(self):
+        """Pausa la cola: termina el trabajo en curso y no toma el siguiente."""
+        self.queue.set_paused(True)
+        self._stop.set()
+        self._report()
+
+    def resume(self):
+        """Arranca si la cola no quedó pausada la última vez (al abrir la app)."""
+        if not self.queue.paused:
+            self.start()
+
+    # ---------- Progreso / ETA ----------
+    def status(self) -> dict:
+        pending = self.queue.pending()
+        remaining = sum(j["points_total"] for j in pending)
+        cur = self.current
+        if cur is not None:
+            remaining += max(0, cur["points_total"] - cur["points_done"])
+        eta = None if self.per_point_s is None else remaining * self.per_point_s
+        return {
+            "running": self.active,
+            "current": None if cur is None else dict(cur),
+            "pending": len(pending),
+            "remaining_points": remaining,
+            "per_point_s": self.per_point_s,
+            "eta_s": eta,
+        }
+
+    def summary(self) -> str:
+        st = self.status()
+        parts = ["Cola: " + ("activa" if st["running"] else "pausada"), f"{st['pending']} pendiente(s)"]
+        cur = st["current"]
+        if cur is not None:
+            parts.append(f"trabajo #{cur['id']} {cur['points_done']}/{cur['points_total']} pts")
+        if st["eta_s"] is not None and st["remaining_points"]:
+            parts.append(f"ETA {_fmt_secs(st['eta_s'])} ({st['per_point_s']:.2f} s/pt)")
+        return " · ".join(parts)
+
+    def _report(self):
+        if self.on_progress:
+            try:
+                self.on_progress(self.status())
+            except Exception:
+                pass
+
+    def _on_point(self, index: int, freq: int, value: float):
+        now = time.monotonic()
+        if self._last_point_t is not None:
+            dt = now - self._last_point_t
+            self.per_point_s = dt if self.per_point_s is None else 0.8 * self.per_point_s + 0.2 * dt
+        self._last_point_t = now
+        if self.current is not None:
+            self.current["points_done"] = index + 1
+        self._report()
+
+    # ---------- Bucle ----------
+    def _loop(self):
+        while True:
+            with self._state_lock:
+                if self._stop.is_set():
+                    self._thread = None  # start() desde aquí crea un hilo nuevo
+                    break
+            job = next(iter(self.queue.pending()), None)
+            svc = self.get_service(job["instrument"]) if job else None
+            if job is None or svc is None:
+                self._stop.wait(self.idle_poll)
+                continue
+            self._run_job(job, svc)
+        self._report()
+
+    def _run_job(self, job: dict, svc):
+        self.current = job
+        self._last_point_t = time.monotonic()
+        self.queue.update(job["id"], status=RUNNING, started=time.time(), points_done=0)
+        self._report()
+        plan = job["plan"]
+        try:
+            values = svc.run_measurement_sequence(
+                repeats=int(plan["repeats"]),
+                delay=float(plan["delay"]),
+                csv_path=job["output"],
+                start_hz=int(plan["start_hz"]),
+                step_hz=int(plan["step_hz"]),
+                on_point=self._on_point,
+                defer_failed=bool(plan.get("defer_failed", False)),
+                dut_id=str(plan.get("dut", "")),
+                use_cache=bool(plan.get("use_cache", False)),
+            )
+            status = DONE if values else FAILED
+            self.queue.update(job["id"], status=status, finished=time.time(),
+                              points_done=len(values), error="" if values else "sin lecturas")
+        except Exception as e:
+            self.queue.update(job["id"], status=FAILED, finished=time.time(), error=str(e))
+        finally:
+            self.current = None
+            self._report()
+
+
+def _fmt_secs(secs: float) -> str:
+    secs = int(round(secs))
+    h, rem = divmod(secs, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}h{m:02d}m" if h else f"{m}m{s:02d}s"
@@ -0,0 +1,126 @@
+# src/limit_mask.py
+import csv
+import math
+from bisect import bisect_left
+from typing import List, Optional
+
+# Veredictos por punto
+VERDICT_PASS = "OK"
+VERDICT_WARN = "AVISO"
+VERDICT_FAIL = "FALLA"
+VERDICT_NONE = "SIN_LIMITE"
+
+
+class LimitMask:
+    """
+    Máscara de límites THD vs Frecuencia para ensayos pasa/no-pasa.
+
+    Se define por puntos (frecuencia, THD máximo [, THD de aviso]); entre puntos
+    el límite se interpola linealmente en escala log-frecuencia. Fuera del rango
+    de la máscara el punto no se evalúa (SIN_LIMITE).
+
+    Archivo CSV (mismo estilo que thd_data.csv):
+        Frecuencia,THD_max,THD_warn
+        20,1.0,0.8
+        1000,0.1,0.08
+        20000,0.5,
+    """
+
+    def __init__(self, points: List[tuple], name: str = "máscara"):
+        pts = sorted((float(p[0]), float(p[1]), None if len(p) < 3 or p[2] is None else float(p[2]))
+                     for p in points)
+        if not pts:
+            raise ValueError("La máscara no tiene puntos.")
+        if any(f <= 0 for f, _, _ in pts):
+            raise ValueError("Las frecuencias de la máscara deben ser > 0.")
+        self.name = name
+        self._freqs = [f for f, _, _ in pts]
+        self._logf = [math.log10(f) for f in self._freqs]
+        self._hard = [h for _, h, _ in pts]
+        self._warn = [w for _, _, w in pts]
+
+    # ---------- Carga ----------
+    @classmethod
+    def from_csv(cls, path: str) -> "LimitMask":
+        """Carga una máscara desde CSV (coma decimal aceptada)."""
+        def _num(txt: str) -> Optional[float]:
+            txt = (txt or "").strip().replace(",", ".")
+            return float(txt) if txt else None
+
+        points = []
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            header = f.readline()
+            delim = ";" if header.count(";") else ","
+            f.seek(0)
+            for row in csv.DictReader(f, delimiter=delim):
+                freq = _num(row.get("Frecuencia"))
+                hard = _num(row.get("THD_max"))
+                if freq is None or hard is None:
+                    continue
+                points.append((freq, hard, _num(row.get("THD_warn"))))
+        return cls(points, name=path)
+
+    # ---------- Evaluación ----------
+    @property
+    def f_min(self) -> float:
+        return self._freqs[0]
+
+    @property
+    def f_max(self) -> float:
+        return self._freqs[-1]
+
+    def _interp(self, values: List[Optional[float]], freq: float) -> Optional[float]:
+        if len(self._freqs) == 1:
+            return values[0]
+        lf = math.log10(freq)
+        j = bisect_left(self._logf, lf)
+        if j == 0:
+            return values[0]
+        if j >= len(self._logf):
+            return values[-1]
+        if self._logf[j] == lf:
+            return values[j]
+        v0, v1 = values[j - 1], values[j]
+        if v0 is None or v1 is None:
+            return None
+        t = (lf - self._logf[j - 1]) / (self._logf[j] - self._logf[j - 1])
+        return v0 + t * (v1 - v0)
+
+    def limits_at(self, freq: float) -> tuple:
+        """(límite duro, límite de aviso) en freq, o (None, None) fuera de la máscara."""
+        if freq is None or freq < self.f_min or freq > self.f_max:
+            return None, None
+        return self._interp(self._hard, freq), self._interp(self._warn, freq)
+
+    def evaluate(self, freq: float, thd: float) -> dict:
+        """
+        Evalúa un punto. Devuelve dict con:
+          freq, thd, limit, verdict (OK/AVISO/FALLA/SIN_LIMITE) y
+          margin = límite - THD (positivo = holgura, negativo = excedido).
+        Un THD no numérico (NaN) dentro de la máscara cuenta como FALLA.
+        """
+        hard, warn = self.limits_at(freq)
+        out = {"freq": freq, "thd": thd, "limit": hard, "verdict": VERDICT_NONE, "margin": None}
+        if hard is None:
+            return out
+        if thd is None or math.isnan(thd):
+            out["verdict"] = VERDICT_FAIL
+            return out
+        out["margin"] = hard - thd
+        if thd > hard:
+            out["verdict"] = VERDICT_FAIL
+        elif warn is not None and thd > warn:
+            out["verdict"] = VERDICT_WARN
+        else:
+            out["verdict"] = VERDICT_PASS
+        return out
+
+    @staticmethod
+    def overall(verdicts: List[dict]) -> str:
+        """Veredicto global: FALLA si algún punto falla, AVISO si alguno avisa, si no OK."""
+        kinds = {v["verdict"] for v in verdicts}
+        if VERDICT_FAIL in kinds:
+            return VERDICT_FAIL
+        if VERDICT_WARN in kinds:
+            return VERDICT_WARN
+        return VERDICT_PASS
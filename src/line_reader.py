@@ -0,0 +1,71 @@
+# src/line_reader.py
+from typing import Iterator
+
+
+class LineReader:
+    """
+    Lector de líneas sobre un buffer preasignado (bytearray + memoryview).
+
+    fill() lee con readinto() directo en el espacio libre del buffer todo lo que
+    haya disponible (in_waiting, mínimo 1 byte → respeta el timeout del puerto)
+    en lugar de readline(), que en pyserial lee byte a byte. lines() entrega cada
+    línea completa como memoryview del buffer (con su terminador, sin copiar);
+    la vista solo es válida hasta el próximo fill(): quien necesite texto la
+    decodifica en el momento (str(vista, "utf-8", "ignore")).
+    Si una línea no entra en el buffer se entrega partida en trozos de 'size'.
+    """
+
+    def __init__(self, ser, size: int = 4096):
+        self._ser = ser
+        self._size = size
+        self._buf = bytearray(size)
+        self._mv = memoryview(self._buf)
+        self._start = 0  # primer byte sin entregar
+        self._end = 0    # fin de los datos válidos
+        self._readinto = getattr(ser, "readinto", None)
+
+    @property
+    def pending(self) -> int:
+        """Bytes recibidos que todavía no forman una línea completa."""
+        return self._end - self._start
+
+    def find(self, pattern: bytes) -> int:
+        """Posición de 'pattern' en las líneas completas sin entregar (-1 si no está), sin copiar."""
+        last = self._buf.rfind(b"\n", self._start, self._end)
+        return -1 if last < 0 else self._buf.find(pattern, self._start, last + 1)
+
+    def fill(self) -> int:
+        """Lee lo disponible en el puerto; devuelve la cantidad de bytes leídos."""
+        if self._start:
+            # Compacta: mueve el resto (línea incompleta) al inicio, sin realocar
+            n = self._end - self._start
+            self._mv[:n] = self._mv[self._start:self._end]
+            self._start, self._end = 0, n
+        free = self._size - self._end
+        if free == 0:
+            return 0
+        want = max(1, min(free, getattr(self._ser, "in_waiting", 0) or 0))
+        target = self._mv[self._end:self._end + want]
+        if self._readinto is not None:
+            got = self._readinto(target) or 0
+        else:
+            data = self._ser.read(want)
+            got = len(data)
+            target[:got] = data
+        self._end += got
+        return got
+
+    def lines(self) -> Iterator[memoryview]:
+        """Líneas completas ya recibidas (vistas del buffer, terminador incluido)."""
+        buf, mv = self._buf, self._mv
+        while self._start < self._end:
+            i = buf.find(b"\n", self._start, self._end)
+            if i < 0:
+                if self._start == 0 and self._end == self._size:
+                    # Línea más larga que el buffer: se entrega tal cual
+                    self._start = self._end
+                    yield mv[:self._size]
+                return
+            line = mv[self._start:i + 1]
+            self._start = i + 1
+            yield line
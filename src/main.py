@@ -1,7 +1,13 @@
 # src/main.py
+import os
 import flet as ft
 from chat import chat_content
 from graph import graph_content
+from app_state import api_ref
+from stream_api import EventHub, StreamServer
+
+# Puerto de la API local de streaming (0 = deshabilitada)
+API_PORT = int(os.environ.get("THD_API_PORT", "8765"))
 
 # ===== Paleta oscura (estática) =====
 APP_BG       = "#0E1117"  # fondo general de la app
@@ -48,5 +54,57 @@ def main(page: ft.Page):
     layout = ft.Row(controls=[left_card, right_card], expand=True)
     page.add(ft.Column([top_bar, layout], expand=True))
 
+def _output_name(raw) -> str:
+    """CSV de salida pedido por la API: solo un nombre de archivo en el directorio de datos."""
+    name = str(raw or "thd_data.csv").strip()
+    if (any(c in name for c in "/\\:") or ".." in name or os.path.basename(name) != name
+            or not name.lower().endswith(".csv")):
+        raise ValueError(f"'output' debe ser un nombre de archivo .csv sin rutas: {name!r}")
+    return name
+
+
+def submit_sweep(body: dict) -> int:
+    """POST /sweeps → encola en la cola de barridos del panel."""
+    jobs = api_ref["jobs"]
+    if jobs is None:
+        raise RuntimeError("La cola de barridos todavía no está disponible.")
+    plan = {k: body[k] for k in ("repeats", "delay", "start_hz", "step_hz") if k in body}
+    for k in ("repeats", "start_hz", "step_hz"):
+        if k in plan:
+            plan[k] = int(plan[k])
+    if "delay" in plan:
+        plan["delay"] = float(plan["delay"])
+    for k in ("defer_failed", "use_cache"):
+        if k in body:
+            plan[k] = bool(body[k])
+    if "dut" in body:
+        plan["dut"] = str(body["dut"])
+    job_id = jobs.add(plan, instrument=str(body.get("instrument", "")),
+                      priority=int(body.get("priority", 0)), output=_output_name(body.get("output")))
+    api_ref["hub"].publish("job", {"state": "queued", "job_id": job_id, "plan": plan})
+    return job_id
+
+
+def api_status() -> dict:
+    sched = api_ref["scheduler"]
+    return {"queue": sched.status() if sched else None}
+
+
+def start_api():
+    api_ref["hub"] = EventHub()
+    if API_PORT <= 0:
+        return
+    server = StreamServer(
+        api_ref["hub"], submit_sweep, status=api_status,
+        list_sweeps=lambda: api_ref["jobs"].jobs() if api_ref["jobs"] else [],
+        port=API_PORT,
+    )
+    try:
+        server.start()
+    except OSError as e:
+        print(f"No se pudo iniciar la API de streaming: {e}")
+
+
 if __name__ == "__main__":
+    start_api()
     ft.app(target=main)
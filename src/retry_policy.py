@@ -0,0 +1,142 @@
+# src/retry_policy.py
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Optional, Tuple
+
+# Resultado de un intento de lectura
+REPLY_NUMBER = "numero"     # llegó un número
+REPLY_GARBAGE = "basura"    # llegó texto pero no número (p. ej. error del firmware)
+REPLY_SILENCE = "silencio"  # no llegó nada dentro del timeout
+
+
+class AdaptiveRetryPolicy:
+    """
+    Timeouts y reintentos aprendidos de la latencia observada del instrumento.
+
+    - Guarda las últimas 'window' latencias (envío → respuesta) por comando y por
+      banda de frecuencia (octavas desde 20 Hz): las bajas frecuencias del
+      analizador tardan más que las altas.
+    - timeout_for() = percentil 'percentile' × 'margin', acotado a
+      [min_timeout, max_timeout]; sin muestras suficientes usa default_timeout.
+    - retry_delay(): backoff exponencial si hubo silencio; reintento inmediato si
+      el equipo contestó algo no numérico (ya está despierto).
+    - Tras 'dead_after' silencios seguidos el enlace se considera muerto: no se
+      reintenta, pero cada lectura sigue siendo una sonda con el timeout
+      aprendido (o default_timeout), así un equipo lento puede volver a contestar.
+      Se revive con cualquier respuesta o tras 'cooldown' segundos; reset() al
+      reconectar olvida todo.
+    """
+
+    def __init__(
+        self,
+        default_timeout: float = 1.0,
+        min_timeout: float = 0.15,
+        max_timeout: float = 5.0,
+        window: int = 50,
+        min_samples: int = 5,
+        percentile: float = 95.0,
+        margin: float = 1.5,
+        base_delay: float = 0.2,
+        max_delay: float = 2.0,
+        dead_after: int = 4,
+        cooldown: float = 30.0,
+    ):
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.margin = margin
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_after = dead_after
+        self.cooldown = cooldown
+
+        self._lock = threading.Lock()
+        self._samples: Dict[Tuple[str, int], deque] = defaultdict(lambda: deque(maxlen=window))
+        self._silences = 0
+        self._dead_since: Optional[float] = None
+
+    def reset(self):
+        """Olvida latencias y silencios (p. ej. al reconectar el puerto)."""
+        with self._lock:
+            self._samples.clear()
+            self._silences = 0
+            self._dead_since = None
+
+    # ---------- Claves ----------
+    @staticmethod
+    def band(freq: Optional[float]) -> int:
+        """Octava desde 20 Hz (-1 si no se conoce la frecuencia)."""
+        if not freq or freq <= 0:
+            return -1
+        return max(0, int(math.log2(freq / 20.0)))
+
+    # ---------- Observación ----------
+    def observe(self, cmd: str, freq: Optional[float], latency: Optional[float], outcome: str):
+        """Registra el resultado de una lectura (latency solo si hubo número)."""
+        with self._lock:
+            if outcome == REPLY_SILENCE:
+                self._silences += 1
+                if self._silences >= self.dead_after and self._dead_since is None:
+                    self._dead_since = time.monotonic()
+                return
+            # Cualquier respuesta (aun basura) demuestra que el enlace vive
+            self._silences = 0
+            self._dead_since = None
+            if outcome == REPLY_NUMBER and latency is not None and latency >= 0:
+                self._samples[(cmd, self.band(freq))].append(latency)
+
+    @property
+    def link_dead(self) -> bool:
+        with self._lock:
+            if self._silences < self.dead_after:
+                return False
+            if self._dead_since is not None and time.monotonic() - self._dead_since >= self.cooldown:
+                # Pasó el enfriamiento: vuelve a intentar con reintentos completos
+                self._silences = 0
+                self._dead_since = None
+                return False
+            return True
+
+    # ---------- Decisiones ----------
+    def _percentile(self, values) -> float:
+        data = sorted(values)
+        k = (len(data) - 1) * self.percentile / 100.0
+        lo, hi = math.floor(k), math.ceil(k)
+        return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+    def timeout_for(self, cmd: str, freq: Optional[float] = None) -> float:
+        # Con el enlace muerto también: la sonda necesita tiempo para ver la respuesta
+        with self._lock:
+            samples = self._samples.get((cmd, self.band(freq)))
+            if not samples or len(samples) < self.min_samples:
+                # Sin historia en esta banda: usa la de todas las bandas del comando
+                pooled = [x for (c, _), dq in self._samples.items() if c == cmd for x in dq]
+                samples = pooled if len(pooled) >= self.min_samples else None
+            if samples is None:
+                return self.default_timeout
+            est = self._percentile(samples) * self.margin
+        return min(self.max_timeout, max(self.min_timeout, est))
+
+    def retry_delay(self, attempt: int, last_outcome: str) -> float:
+        """Espera antes del reintento 'attempt' (1, 2, ...)."""
+        if last_outcome == REPLY_GARBAGE:
+            return 0.0
+        return min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+
+    def retries_for(self, retries: int) -> int:
+        """Con el enlace muerto no se reintenta."""
+        return 0 if self.link_dead else retries
+
+    def summary(self) -> str:
+        with self._lock:
+            parts = []
+            for (cmd, band), dq in sorted(self._samples.items()):
+                if dq:
+                    lo = 20 * 2 ** band if band >= 0 else None
+                    rng = f"{lo:.0f}-{2 * lo:.0f} Hz" if lo else "?"
+                    parts.append(f"{cmd} {rng}: p{self.percentile:.0f}={self._percentile(dq) * 1000:.0f} ms (n={len(dq)})")
+        return "Latencias: " + ("; ".join(parts) if parts else "sin datos")
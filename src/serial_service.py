@@ -5,20 +5,52 @@ import threading
 import time
 import re
 import csv
-from typing import List, Optional, Iterable
+import math
+from typing import Callable, List, Optional, Iterable
+
+from deadline_scheduler import DeadlineScheduler
+from line_reader import LineReader
+from instrument_state import InstrumentState, FIRMWARE_BANNER, FIRMWARE_ERRORS
+from limit_mask import LimitMask, VERDICT_FAIL
+from serial_trace import TraceRecorder, RecordingSerial, ReplaySerial
+from retry_policy import AdaptiveRetryPolicy, REPLY_NUMBER, REPLY_GARBAGE, REPLY_SILENCE
+from storage.data.measurement_cache import setup_key
 
 
 class SerialService:
     """
     Servicio de puerto serie con:
       - abrir/cerrar
-      - lectura continua (publica en pubsub con sender 'gpib' y guarda log)
+      - lectura continua (publica en pubsub con sender 'gpib' y guarda log de bytes crudos)
       - envío con \r \n
-      - envío por lotes con intervalo
+      - envío por lotes con intervalo (deadlines absolutos, cancelable)
       - envío desde archivo con comando especial \D <seg>
-      - ejecución de secuencia de medición (UP -> RL) con reintentos
+      - ejecución de secuencia de medición (UP -> RL) con reintentos y timeouts adaptativos
+      - evaluación punto a punto contra máscara de límites (con aborto opcional)
+      - modo diferido: puntos fallidos como NaN + motivo y segunda pasada solo sobre ellos
+      - grabación de la sesión (record_path) y reproducción de una traza (replay_path)
+      - publicación de puntos, estado y chat en un EventHub (API de streaming), opcional
+      - caché de puntos por DUT + configuración + frecuencia (MeasurementCache), opcional
+      - modelo del estado del analizador: la inicialización solo envía lo que cambia
     """
 
+    # Configuración del analizador al inicio de cada barrido (FN = incremento de UP)
+    SEQUENCE_INIT = [
+        "CLR",
+        "34.0SP",
+        "P2",
+        "O1",
+        "AP 1.0VL",
+        "FR 1.0KZ",
+        "FN 1.0KZ",
+        "S3",
+        "RL",
+    ]
+
+    # Origen de cada punto del barrido
+    SOURCE_MEASURED = "medido"
+    SOURCE_CACHE = "caché"
+
     def __init__(
         self,
         port: str,
@@ -27,6 +59,14 @@ class SerialService:
         pubsub=None,
         auto_read: bool = True,
         log_path: str = "log.txt",
+        archive=None,
+        record_path: Optional[str] = None,
+        replay_path: Optional[str] = None,
+        replay_speed: float = 1.0,
+        event_hub=None,
+        retry_policy: Optional[AdaptiveRetryPolicy] = None,
+        cache=None,
+        echo_console: bool = False,
     ):
         self.port = port
         self.baudrate = baudrate
@@ -34,15 +74,45 @@ class SerialService:
         self.pubsub = pubsub
         self.auto_read = auto_read
         self.log_path = log_path
+        # Historial comprimido (SweepArchive) donde se agrega cada barrido, opcional
+        self.archive = archive
+        # Traza binaria: grabar todo lo enviado/recibido, o reproducir una sesión grabada
+        self.record_path = record_path
+        self.replay_path = replay_path
+        self.replay_speed = replay_speed
+        # Fan-out de eventos para visores remotos (stream_api.EventHub)
+        self.event_hub = event_hub
+        # Timeouts/reintentos aprendidos de la latencia real del instrumento
+        self.retry_policy = retry_policy or AdaptiveRetryPolicy(default_timeout=timeout)
+        self._last_send_t: Optional[float] = None
+        self._last_outcome = REPLY_SILENCE
+        self._last_latency: Optional[float] = None
+        self.last_failure = ""
+        self.last_reasons: List[str] = []
+        # Caché de mediciones (storage.data.MeasurementCache), opcional
+        self.cache = cache
+        self.last_sources: List[str] = []
+        # Eco de cada línea recibida en consola (debug); apagado por defecto
+        self.echo_console = echo_console
+        # Configuración conocida del analizador (se actualiza con cada envío)
+        self.instrument_state = InstrumentState()
+        self._banner = FIRMWARE_BANNER.encode("utf-8")
+        self._bus_errors = tuple(e.encode("utf-8") for e in FIRMWARE_ERRORS)
 
         self.ser: Optional[serial.Serial] = None
         self._read_thread: Optional[threading.Thread] = None
         self._reading = False
         self._send_lock = threading.Lock()
+        self._seq_lock = threading.Lock()
 
         # Hilos auxiliares de envío
         self._batch_thread: Optional[threading.Thread] = None
         self._file_thread: Optional[threading.Thread] = None
+        self._send_cancel = threading.Event()
+        self.last_send_stats: Optional[dict] = None
+
+        # Veredictos por punto de la última secuencia (si se usó máscara)
+        self.last_verdicts: List[dict] = []
 
     # ---------- Utilidades estáticas ----------
     @staticmethod
@@ -68,11 +138,21 @@ class SerialService:
         """Abre el puerto (y arranca lectura si auto_read=True)."""
         if self.is_running:
             return
+        # Tras (re)conectar no se sabe cómo quedó el analizador ni cuánto tarda
+        self.instrument_state.invalidate()
+        self.retry_policy.reset()
         try:
-            self.ser = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=self.timeout)
-            # Algunos Arduinos reinician al abrir el puerto
-            time.sleep(2)
-            self._emit_system(f"Puerto {self.port} abierto @ {self.baudrate} bps.")
+            if self.replay_path:
+                self.ser = ReplaySerial(self.replay_path, speed=self.replay_speed, timeout=self.timeout)
+                self._emit_system(f"Reproduciendo traza {self.replay_path} (x{self.replay_speed or 'máx'}).")
+            else:
+                self.ser = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=self.timeout)
+                # Algunos Arduinos reinician al abrir el puerto
+                time.sleep(2)
+                self._emit_system(f"Puerto {self.port} abierto @ {self.baudrate} bps.")
+            if self.record_path:
+                self.ser = RecordingSerial(self.ser, TraceRecorder(self.record_path))
+                self._emit_system(f"Grabando sesión en {self.record_path}.")
             if self.auto_read:
                 self.start_read()
         except Exception as e:
@@ -80,7 +160,8 @@ class SerialService:
             raise
 
     def stop(self):
-        """Detiene lectura (si la hay) y cierra el puerto."""
+        """Detiene lectura (si la hay), cancela envíos en curso y cierra el puerto."""
+        self.cancel_send()
         self.stop_read()
         try:
             if self.ser and self.ser.is_open:
@@ -103,21 +184,13 @@ class SerialService:
         path = log_path or self.log_path
 
         def _loop():
-            # abre el archivo una vez y escribe por línea
+            # abre el archivo una vez; el log recibe los bytes tal como llegan
+            reader = LineReader(self.ser)
             try:
-                with open(path, "a", encoding="utf-8") as log_file:
+                with open(path, "ab") as log_file:
                     while self._reading:
                         try:
-                            line = self.ser.readline()
-                            if not line:
-                                continue
-                            txt = line.decode("utf-8", errors="ignore").strip()
-                            if txt:
-                                # publica al chat como 'gpib'
-                                self._emit_chat(txt)
-                                # persiste
-                                log_file.write(txt + "\r\n")
-                                log_file.flush()
+                            self._pump_lines(reader, log_file)
                         except Exception as ex:
                             self._emit_system(f"Error al leer: {ex}")
                             break
@@ -128,6 +201,47 @@ class SerialService:
         self._read_thread.start()
         self._emit_system(f"Lectura continua iniciada (log: {path}).")
 
+    def _pump_lines(self, reader: LineReader, log_file) -> int:
+        """
+        Una vuelta del lector continuo: llena el buffer, escribe las líneas
+        completas crudas al log y solo decodifica si alguien consume texto
+        (chat, API de streaming o eco en consola). Devuelve bytes leídos.
+        """
+        got = reader.fill()
+        if not got:
+            return 0
+        if reader.find(self._banner) >= 0:
+            self._firmware_reset()
+        elif any(reader.find(e) >= 0 for e in self._bus_errors):
+            self._bus_error()
+        wants_text = self.pubsub is not None or self.event_hub is not None or self.echo_console
+        for line in reader.lines():
+            log_file.write(line)
+            if wants_text:
+                txt = str(line, "utf-8", "ignore").strip()
+                if txt:
+                    # publica al chat como 'gpib'
+                    self._emit_chat(txt)
+        log_file.flush()
+        return got
+
+    def _firmware_reset(self):
+        """El Arduino reinició (banner del firmware): el estado del analizador es desconocido."""
+        self.instrument_state.invalidate()
+        self._emit_system("Firmware reiniciado: se reenviará la configuración completa.")
+
+    def _bus_error(self):
+        """Error del bus GPIB: no se sabe si el último ajuste llegó al analizador."""
+        if self.instrument_state.invalidate():
+            self._emit_system("Error del bus GPIB: se reenviará la configuración completa.")
+
+    def _scan_firmware(self, data: bytes):
+        """Revisa texto recibido (sin decodificar) en busca del banner o errores del bus."""
+        if self._banner in data:
+            self._firmware_reset()
+        elif any(e in data for e in self._bus_errors):
+            self._bus_error()
+
     def stop_read(self):
         """Detiene el hilo de lectura continua."""
         if not self._reading:
@@ -144,34 +258,53 @@ class SerialService:
             self._emit_system("Puerto no está abierto.")
             return
         try:
-            with self._send_lock:
-                self.ser.write((data + "\r\n").encode("utf-8"))
+            self._write_line(data)
         except Exception as e:
             self._emit_system(f"Error al enviar dato: {e}")
 
+    def _write_line(self, data: str):
+        """
+        Escribe una línea y actualiza el modelo del analizador. Camino único para
+        todo envío (chat, lotes, archivo, secuencia); propaga errores de E/S.
+        """
+        with self._send_lock:
+            self.ser.write((data + "\r\n").encode("utf-8"))
+            self._last_send_t = time.monotonic()
+        self.instrument_state.observe(data)
+
     def send_lines(self, commands: Iterable[str], interval: float = 1.0):
-        """Envía una lista/iterable de líneas con un intervalo fijo (en segundos)."""
+        """
+        Envía una lista/iterable de líneas con un período fijo (en segundos).
+        Cada envío sale en un deadline absoluto (sin deriva acumulada); se puede
+        cancelar con cancel_send().
+        """
         if self._batch_thread and self._batch_thread.is_alive():
             self._emit_system("Ya hay un envío por lotes en curso.")
             return
 
+        self._send_cancel.clear()
+        sched = DeadlineScheduler(interval, cancel_event=self._send_cancel)
+
         def _send_job():
             cmds = list(commands)
             total = len(cmds)
             for i, cmd in enumerate(cmds, start=1):
+                if not sched.wait_next():
+                    self._emit_system("⏹️  Envío por lotes cancelado.")
+                    break
                 if not self.is_running:
                     self._emit_system("Puerto no está abierto. Envío cancelado.")
                     break
                 try:
-                    with self._send_lock:
-                        self.ser.write((cmd + "\r\n").encode("utf-8"))
+                    self._write_line(cmd)
                     self._emit_system(f"[{i}/{total}] Enviado: {cmd}")
                 except Exception as e:
                     self._emit_system(f"Error al enviar: {e}")
                     break
-                time.sleep(max(0.0, float(interval)))
             else:
                 self._emit_system("✅ Envío de comandos terminado.")
+            self.last_send_stats = sched.stats()
+            self._emit_system(sched.summary())
 
         self._batch_thread = threading.Thread(target=_send_job, daemon=True)
         self._batch_thread.start()
@@ -182,6 +315,7 @@ class SerialService:
         Reglas:
           - Líneas vacías o que empiezan con '#' se ignoran.
           - Comando especial:  \D <segundos>   cambia el intervalo de envío.
+        Los envíos salen en deadlines absolutos; se puede cancelar con cancel_send().
         """
         if self._file_thread and self._file_thread.is_alive():
             self._emit_system("Ya hay un envío desde archivo en curso.")
@@ -194,9 +328,12 @@ class SerialService:
             self._emit_system(f"Archivo no encontrado: {filename}")
             return
 
+        self._send_cancel.clear()
+        sched = DeadlineScheduler(default_interval, cancel_event=self._send_cancel)
+
         def _file_job():
-            interval = float(default_interval)
             total = len(lines)
+            cancelled = False
             i = 0
             while i < total:
                 line = lines[i]
@@ -207,8 +344,8 @@ class SerialService:
                         parts = line.split()
                         if len(parts) == 2:
                             try:
-                                interval = float(parts[1])
-                                self._emit_system(f"⏱️  Intervalo cambiado a {interval} s.")
+                                sched.set_interval(float(parts[1]))
+                                self._emit_system(f"⏱️  Intervalo cambiado a {sched.interval} s.")
                             except Exception as e:
                                 self._emit_system(f"⚠️  Error al interpretar delay: {line} → {e}")
                         else:
@@ -216,25 +353,35 @@ class SerialService:
                     else:
                         self._emit_system(f"⚠️  Comando especial no reconocido: {line}")
                 else:
-                    # Enviar línea normal
+                    # Enviar línea normal en su deadline
+                    if not sched.wait_next():
+                        cancelled = True
+                        break
                     if not self.is_running:
                         self._emit_system("❌ Puerto no está abierto.")
                         break
                     try:
-                        with self._send_lock:
-                            self.ser.write((line + "\r\n").encode("utf-8"))
+                        self._write_line(line)
                         self._emit_system(f"[{i+1}/{total}] Enviado: {line}")
                     except Exception as e:
                         self._emit_system(f"❌ Error al enviar '{line}': {e}")
                         break
-                    time.sleep(max(0.0, interval))
                 i += 1
 
-            self._emit_system("✅ Envío de comandos finalizado.")
+            if cancelled:
+                self._emit_system("⏹️  Envío desde archivo cancelado.")
+            else:
+                self._emit_system("✅ Envío de comandos finalizado.")
+            self.last_send_stats = sched.stats()
+            self._emit_system(sched.summary())
 
         self._file_thread = threading.Thread(target=_file_job, daemon=True)
         self._file_thread.start()
 
+    def cancel_send(self):
+        """Cancela el envío por lotes / desde archivo en curso (si lo hay)."""
+        self._send_cancel.set()
+
     # ---------- Secuencia de medición (con reintentos RL) ----------
     def run_measurement_sequence(
         self,
@@ -245,13 +392,47 @@ class SerialService:
         step_hz: int = 1000,
         rl_retries: int = 3,
         rl_retry_delay: float = 0.2,
+        limit_mask: Optional[LimitMask] = None,
+        abort_on_fail: bool = False,
+        on_point: Optional[Callable[[int, int, float], None]] = None,
+        defer_failed: bool = False,
+        dut_id: str = "",
+        use_cache: bool = False,
+        cache_ttl: Optional[float] = None,
     ) -> list[float]:
         """
         Ejecuta la secuencia de comandos y retorna los valores de RL en un vector.
         Si csv_path no es None, exporta a CSV con columnas (Frecuencia, THD) y
         frecuencias 1000, 2000, ... según la cantidad de lecturas.
+        'delay' es la espera tras cada comando de ajuste/UP/FR; tras 'RL' no hay
+        espera fija: la lectura usa el timeout adaptativo (self.retry_policy).
         Reintenta reenviando 'RL' hasta rl_retries veces si no se obtiene número.
+        Con limit_mask, cada punto se evalúa al medirse (veredicto y margen en
+        self.last_verdicts y columnas extra del CSV); con abort_on_fail=True la
+        secuencia se corta en la primera FALLA.
+        on_point(índice, frecuencia, valor) se llama tras cada punto medido.
+        Con defer_failed=True un punto sin lectura válida no se reintenta en el
+        momento: queda NaN (motivo en self.last_reasons y columna 'Motivo' del
+        CSV) y el barrido sigue; al final una segunda pasada resintoniza (FR/FN)
+        y vuelve a medir solo esas frecuencias. Lo que siga fallando queda NaN.
+        Con use_cache=True y un dut_id, los puntos frescos (cache_ttl, o el TTL
+        de la caché) con la misma configuración se reutilizan y solo se miden
+        las frecuencias que faltan (sintonía directa con FR); el origen de cada
+        punto queda en self.last_sources y en la columna 'Origen' del CSV.
+        Dos secuencias nunca se intercalan: la segunda espera a que termine la primera.
         """
+        with self._seq_lock:
+            return self._run_sequence_locked(
+                repeats, delay, csv_path, start_hz, step_hz, rl_retries, rl_retry_delay,
+                limit_mask, abort_on_fail, on_point, defer_failed,
+                dut_id, use_cache, cache_ttl,
+            )
+
+    def _run_sequence_locked(
+        self, repeats, delay, csv_path, start_hz, step_hz, rl_retries, rl_retry_delay,
+        limit_mask, abort_on_fail, on_point, defer_failed=False,
+        dut_id="", use_cache=False, cache_ttl=None,
+    ) -> list[float]:
         if not self.is_running:
             self._emit_system("Puerto no está abierto.")
             return []
@@ -271,41 +452,129 @@ class SerialService:
         except Exception:
             pass
 
-        sequence_init = [
-            "CLR",
-            "34.0SP",
-            "P2",
-            "O1",
-            "AP 1.0VL",
-            "FR 1.0KZ",
-            "FN 1.0KZ",
-            "S3",
-            "RL",
-        ]
+        sequence_init = list(self.SEQUENCE_INIT)
+
+        # Puntos reutilizables de la caché (mismo DUT y configuración, frescos)
+        plan_freqs = [start_hz + i * step_hz for i in range(repeats + 1)]
+        use_cache = bool(use_cache and dut_id and self.cache is not None)
+        setup = setup_key(sequence_init) if use_cache else ""
+        cached: dict = {}
+        if use_cache:
+            try:
+                cached = self.cache.lookup(dut_id, setup, plan_freqs, ttl=cache_ttl)
+            except Exception as e:
+                self._emit_system(f"Error leyendo caché: {e}")
+            if cached:
+                self._emit_system(
+                    f"Caché: {len(cached)}/{len(plan_freqs)} punto(s) reutilizados para DUT '{dut_id}'."
+                )
 
         results: list[float] = []
+        reasons: list[str] = []
+        sources: list[str] = []
+        verdicts: list[Optional[dict]] = []
+        self.last_verdicts = []
+        self.last_reasons = reasons
+        self.last_sources = sources
+        # En modo diferido la primera pasada no reintenta y marca NaN
+        first_retries = 0 if defer_failed else rl_retries
+        fallback = math.nan if defer_failed else 0.0
+        self._publish("sweep", {"state": "started", "port": self.port, "repeats": repeats,
+                                "start_hz": start_hz, "step_hz": step_hz})
+
+        def _evaluate(i: int, freq: int, val: float) -> bool:
+            """Evalúa el punto i contra la máscara; devuelve False si hay que abortar."""
+            v = limit_mask.evaluate(freq, val)
+            verdicts[i] = v
+            margin = "-" if v["margin"] is None else f"{v['margin']:+.4f}"
+            self._emit_system(f"{freq} Hz: THD {val:.4f} → {v['verdict']} (margen {margin})")
+            if abort_on_fail and v["verdict"] == VERDICT_FAIL:
+                self._emit_system(f"⛔ Falla en {freq} Hz → secuencia abortada.")
+                return False
+            return True
+
+        def _record(val: float, source: str = self.SOURCE_MEASURED) -> bool:
+            """Agrega el punto y lo evalúa; devuelve False si hay que abortar."""
+            missing = math.isnan(val)
+            # Lectura fallida: NaN en modo diferido, 0.0 de respaldo si no
+            failed = source == self.SOURCE_MEASURED and bool(self.last_failure)
+            results.append(val)
+            reasons.append(self.last_failure if failed else "")
+            sources.append(source)
+            verdicts.append(None)
+            i = len(results) - 1
+            freq = start_hz + i * step_hz
+            self._publish("point", {"index": i, "freq": freq, "thd": None if missing else val,
+                                    "reason": reasons[i], "cached": source == self.SOURCE_CACHE})
+            if on_point is not None:
+                try:
+                    on_point(i, freq, val)
+                except Exception:
+                    pass
+            if missing:
+                self._emit_system(f"{freq} Hz: sin lectura ({reasons[i]}) → se reintenta al final.")
+                return True
+            if limit_mask is None:
+                return True
+            # El 0.0 de respaldo no es una medición: se evalúa como NaN (FALLA)
+            return _evaluate(i, freq, math.nan if failed else val)
 
         try:
-            # Enviar secuencia inicial
-            for cmd in sequence_init:
-                self.send(cmd)
-                time.sleep(delay)
-                if cmd == "RL":
-                    val = self._read_numeric_with_retries(
-                        max_wait=self.timeout, retries=rl_retries, retry_delay=rl_retry_delay
+            keep_going = True
+            if cached:
+                # Plan dirigido: configura una vez y sintoniza solo lo que falta
+                for cmd in self._plan_setup(sequence_init[:-1]):
+                    self.send(cmd)
+                    time.sleep(delay)
+                for freq in plan_freqs:
+                    hit = cached.get(float(freq))
+                    if hit is not None:
+                        keep_going = _record(hit["thd"], self.SOURCE_CACHE)
+                    else:
+                        keep_going = _record(self._measure_at(
+                            freq, delay, first_retries, rl_retry_delay, fallback
+                        ))
+                    if not keep_going:
+                        break
+            else:
+                # Enviar secuencia inicial (solo los ajustes que cambian)
+                for cmd in self._plan_setup(sequence_init):
+                    if cmd == "RL":
+                        keep_going = _record(self._request_reading(
+                            start_hz, first_retries, rl_retry_delay, fallback
+                        ))
+                    else:
+                        self.send(cmd)
+                        time.sleep(delay)
+
+                # Repetir ciclo UP -> RL
+                for _ in range(repeats if keep_going else 0):
+                    self.send("UP")
+                    time.sleep(delay)
+                    val = self._request_reading(
+                        start_hz + len(results) * step_hz, first_retries, rl_retry_delay, fallback
                     )
-                    results.append(val)
+                    if not _record(val):
+                        keep_going = False
+                        break
 
-            # Repetir ciclo UP -> RL
-            for _ in range(repeats):
-                self.send("UP")
-                time.sleep(delay)
-                self.send("RL")
-                time.sleep(delay)
-                val = self._read_numeric_with_retries(
-                    max_wait=self.timeout, retries=rl_retries, retry_delay=rl_retry_delay
-                )
-                results.append(val)
+            # Segunda pasada: solo las frecuencias que quedaron sin lectura
+            missing = [i for i, v in enumerate(results) if math.isnan(v)]
+            if defer_failed and keep_going and missing:
+                self._emit_system(f"Segunda pasada: re-midiendo {len(missing)} punto(s) faltante(s)…")
+                for i in missing:
+                    freq = start_hz + i * step_hz
+                    val = self._measure_at(freq, delay, rl_retries, rl_retry_delay, math.nan)
+                    if math.isnan(val):
+                        reasons[i] = self.last_failure
+                        self._emit_system(f"{freq} Hz: sigue sin lectura ({reasons[i]}).")
+                        continue
+                    results[i] = val
+                    reasons[i] = ""
+                    self._publish("point", {"index": i, "freq": freq, "thd": val, "reason": "",
+                                            "remeasured": True})
+                    if limit_mask is not None and not _evaluate(i, freq, val):
+                        break
 
         except Exception as e:
             self._emit_system(f"Error en secuencia: {e}")
@@ -317,70 +586,216 @@ class SerialService:
                 except Exception:
                     pass
 
+        extra = {}
+        if limit_mask is not None:
+            # Los puntos que quedaron sin lectura se evalúan como NaN (FALLA dentro de la máscara)
+            self.last_verdicts = [
+                v if v is not None else limit_mask.evaluate(start_hz + i * step_hz, math.nan)
+                for i, v in enumerate(verdicts)
+            ]
+        if limit_mask is not None and self.last_verdicts:
+            self._emit_system(f"Veredicto de la máscara: {LimitMask.overall(self.last_verdicts)}")
+            extra.update({
+                "Limite": ["" if v["limit"] is None else f"{v['limit']:.6f}" for v in self.last_verdicts],
+                "Margen": ["" if v["margin"] is None else f"{v['margin']:.6f}" for v in self.last_verdicts],
+                "Veredicto": [v["verdict"] for v in self.last_verdicts],
+            })
+        missing = sum(1 for r in reasons if r)
+        if missing:
+            extra["Motivo"] = reasons
+            self._emit_system(f"{missing} punto(s) sin lectura válida (ver columna 'Motivo').")
+        if self.SOURCE_CACHE in sources:
+            extra["Origen"] = sources
+
+        # Guardar en la caché solo lo medido ahora con lectura válida (no el 0.0 de respaldo)
+        if use_cache:
+            fresh = {start_hz + i * step_hz: v
+                     for i, (v, src, why) in enumerate(zip(results, sources, reasons))
+                     if src == self.SOURCE_MEASURED and not why}
+            try:
+                self.cache.store(dut_id, setup, fresh)
+            except Exception as e:
+                self._emit_system(f"Error guardando en caché: {e}")
+
         # Exportar CSV si se pidió
         if csv_path:
-            self.save_thd_csv(results, csv_path, start_hz=start_hz, step_hz=step_hz)
+            self.save_thd_csv(results, csv_path, start_hz=start_hz, step_hz=step_hz, extra_columns=extra or None)
 
+        # Agregar al historial si hay uno configurado
+        if self.archive is not None and results:
+            try:
+                freqs = [start_hz + i * step_hz for i in range(len(results))]
+                sweep_id = self.archive.append_sweep(
+                    freqs, results, meta={"port": self.port, "csv": csv_path or "", "dut": dut_id}
+                )
+                self._emit_system(f"Barrido #{sweep_id} agregado al historial.")
+            except Exception as e:
+                self._emit_system(f"Error guardando en historial: {e}")
+
+        self._emit_system(self.retry_policy.summary())
+        self._publish("sweep", {"state": "finished", "port": self.port, "points": len(results)})
         print("Fin de la trama")
         print(results)
         return results
 
     # ---------- Lecturas numéricas con reintentos ----------
-    def _try_read_numeric_once(self, max_wait: float = 1.0) -> Optional[float]:
+    def _plan_setup(self, commands: List[str]) -> List[str]:
+        """Comandos de inicialización que hace falta enviar según el estado conocido."""
+        planned = self.instrument_state.plan(commands)
+        skipped = len(commands) - len(planned)
+        if skipped:
+            self._emit_system(f"Configuración ya aplicada: se omiten {skipped} de {len(commands)} comando(s).")
+        return planned
+
+    def _measure_at(self, freq: int, delay: float, retries: int, retry_delay: float,
+                    fallback: float) -> float:
+        """Sintoniza directo a 'freq' (FR en kHz) y lee RL con reintentos."""
+        self.send(f"FR {freq / 1000.0:.3f}KZ")
+        time.sleep(delay)
+        return self._request_reading(freq, retries, retry_delay, fallback)
+
+    def _request_reading(self, freq: int, retries: int, retry_delay: float, fallback: float) -> float:
+        """
+        Pide una lectura RL del punto 'freq'. Antes descarta lo que haya en la
+        entrada: una respuesta atrasada del punto anterior (p. ej. uno que quedó
+        NaN sin reintentos) no debe leerse como el valor de este.
+        La lectura arranca apenas sale el RL (sin el delay fijo): cuánto esperar
+        lo decide el timeout adaptativo, y la latencia aprendida es la del equipo.
+        """
+        self._drain_input()
+        self.send("RL")
+        return self._read_numeric_with_retries(
+            max_wait=None, retries=retries, retry_delay=retry_delay, freq=freq, fallback=fallback,
+        )
+
+    def _drain_input(self):
+        """Descarta la entrada pendiente, no sin antes buscar errores del firmware en ella."""
+        try:
+            waiting = getattr(self.ser, "in_waiting", 0) or 0
+            stale = self.ser.read(waiting) if waiting else b""
+            self.ser.reset_input_buffer()
+        except Exception:
+            return
+        if stale:
+            self._scan_firmware(bytes(stale))
+
+    def _try_read_numeric_once(self, max_wait: float = 1.0, since_send: bool = False) -> Optional[float]:
         """
         Intenta leer UNA respuesta numérica dentro de max_wait.
         Devuelve float si lo logra, o None si no hay número.
         No reintenta; eso lo maneja _read_numeric_with_retries.
+        Con since_send=True el plazo se cuenta desde el último envío.
+        Deja en self._last_outcome si hubo número, basura o silencio, y en
+        self._last_latency la latencia envío → respuesta.
         """
-        deadline = time.time() + max(0.0, float(max_wait))
+        now = time.monotonic()
+        start = self._last_send_t if since_send and self._last_send_t else now
+        deadline = max(start + max(0.0, float(max_wait)), now + 0.05)
         last_txt = ""
         number_regex = re.compile(r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?")
+        self._last_outcome = REPLY_SILENCE
+        self._last_latency = None
+
+        # Que readline no bloquee más allá del plazo de este intento
+        prev_timeout = getattr(self.ser, "timeout", None)
+        short = min(self.timeout, max(0.05, deadline - now))
+        if prev_timeout is not None and short < prev_timeout:
+            self.ser.timeout = short
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    line = self.ser.readline()  # bytes
+                except Exception as e:
+                    self._emit_system(f"Error al leer respuesta: {e}")
+                    return None
 
-        while time.time() < deadline:
-            try:
-                line = self.ser.readline()  # bytes
-            except Exception as e:
-                self._emit_system(f"Error al leer respuesta: {e}")
-                return None
-
-            if not line:
-                continue
-
-            txt = line.decode("utf-8", errors="ignore").strip()
-            last_txt = txt
-            print(f"Linea (raw): {line!r}  -> '{txt}'")
+                if not line:
+                    continue
+                arrived = time.monotonic()
 
-            if not txt:
-                continue
+                txt = line.decode("utf-8", errors="ignore").strip()
+                last_txt = txt
+                self._scan_firmware(line)
+                if self.echo_console:
+                    print(f"Linea (raw): {line!r}  -> '{txt}'")
 
-            # 1) intento directo
-            try:
-                return float(txt.replace(",", "."))
-            except ValueError:
-                pass
+                if not txt:
+                    continue
+                self._last_outcome = REPLY_GARBAGE
 
-            # 2) extraer primer número válido en la línea
-            m = number_regex.search(txt.replace(",", "."))
-            if m:
+                # 1) intento directo
                 try:
-                    val = float(m.group(0))
-                    self._emit_system(f"Respuesta parseada: '{txt}' -> {val}")
+                    val = float(txt.replace(",", "."))
+                    self._mark_number(arrived)
                     return val
                 except ValueError:
                     pass
 
+                # 2) extraer primer número válido en la línea
+                m = number_regex.search(txt.replace(",", "."))
+                if m:
+                    try:
+                        val = float(m.group(0))
+                        self._emit_system(f"Respuesta parseada: '{txt}' -> {val}")
+                        self._mark_number(arrived)
+                        return val
+                    except ValueError:
+                        pass
+        finally:
+            if prev_timeout is not None and short < prev_timeout:
+                self.ser.timeout = prev_timeout
+
         # Sin número en este intento
         self._emit_system(f"Timeout esperando número. Última respuesta: '{last_txt}'")
         return None
 
-    def _read_numeric_with_retries(self, max_wait: float = 1.0, retries: int = 3, retry_delay: float = 0.2) -> float:
+    def _mark_number(self, arrived: float):
+        """Lectura numérica: latencia = envío → llegada de la línea (no → parseo)."""
+        self._last_outcome = REPLY_NUMBER
+        if self._last_send_t is not None:
+            self._last_latency = arrived - self._last_send_t
+
+    def _read_numeric_with_retries(
+        self,
+        max_wait: Optional[float] = 1.0,
+        retries: int = 3,
+        retry_delay: float = 0.2,
+        freq: Optional[float] = None,
+        fallback: float = 0.0,
+    ) -> float:
         """
         Lee un número con hasta 'retries' reintentos.
-        Cada reintento reenvía 'RL', espera retry_delay y vuelve a leer.
-        Rechaza valores > 100 por inválidos (se reintenta). Devuelve 0.0 si todos fallan.
+        Cada reintento reenvía 'RL', espera y vuelve a leer (en modo adaptativo
+        espera el backoff antes de reenviar y lee enseguida).
+        Con max_wait=None el timeout sale de self.retry_policy (percentil de la
+        latencia observada para RL en la banda de 'freq', contado desde el envío),
+        la espera entre reintentos hace backoff y, si el enlace está muerto, no se reintenta.
+        Rechaza valores > 100 por inválidos (se reintenta). Si todos fallan
+        devuelve 'fallback' (0.0, o NaN en el modo diferido) y deja el motivo
+        en self.last_failure.
         """
+        policy = self.retry_policy
+        adaptive = max_wait is None
+        if adaptive:
+            policy.base_delay = retry_delay
+
+        self.last_failure = ""
+
+        def _attempt() -> Optional[float]:
+            wait = policy.timeout_for("RL", freq) if adaptive else max_wait
+            v = self._try_read_numeric_once(max_wait=wait, since_send=adaptive)
+            policy.observe("RL", freq, self._last_latency, self._last_outcome)
+            if v is not None and v <= 100.0:
+                self.last_failure = ""
+            elif v is not None:
+                self.last_failure = "fuera de rango (>100)"
+            elif v is None:
+                self.last_failure = ("respuesta no numérica" if self._last_outcome == REPLY_GARBAGE
+                                     else "sin respuesta")
+            return v
+
         # Primer intento
-        val = self._try_read_numeric_once(max_wait=max_wait)
+        val = _attempt()
         if val is not None:
             if val <= 100.0:
                 return val
@@ -388,20 +803,28 @@ class SerialService:
                 self._emit_system(f"Valor fuera de rango (>100): {val} → reintentando…")
 
         # Reintentos reenviando RL
+        if adaptive and retries and policy.retries_for(retries) == 0:
+            retries = 0
+            self._emit_system("Enlace sin respuesta: no se reintenta.")
         for i in range(1, retries + 1):
             self._emit_system(f"Reintentando RL ({i}/{retries})…")
-            self.send("RL")
-            time.sleep(max(0.0, retry_delay))
+            if adaptive:
+                # Backoff antes de reenviar: la espera no se cuenta como latencia del equipo
+                time.sleep(max(0.0, policy.retry_delay(i, self._last_outcome)))
+                self.send("RL")
+            else:
+                self.send("RL")
+                time.sleep(max(0.0, retry_delay))
 
-            val = self._try_read_numeric_once(max_wait=max_wait)
+            val = _attempt()
             if val is not None:
                 if val <= 100.0:
                     return val
                 else:
                     self._emit_system(f"Valor fuera de rango (>100): {val} (intento {i}/{retries})")
 
-        self._emit_system("No se obtuvo valor válido tras reintentos → 0.0")
-        return 0.0
+        self._emit_system(f"No se obtuvo valor válido tras reintentos → {fallback}")
+        return fallback
 
     # ---------- Exportar CSV ----------
     def save_thd_csv(
@@ -411,19 +834,26 @@ class SerialService:
         start_hz: int = 1000,
         step_hz: int = 1000,
         float_fmt: str = "{:.6f}",
+        extra_columns: Optional[dict] = None,
     ) -> str:
         """
         Guarda un CSV con columnas: Frecuencia, THD
-        Filas: 1000, v0 ; 2000, v1 ; 3000, v2 ; etc.
+        Filas: 1000, v0 ; 2000, v1 ; 3000, v2 ; etc. Un NaN queda como THD vacío.
+        extra_columns: {nombre: lista de valores} agrega columnas a la derecha
+        (p. ej. Veredicto/Margen de la máscara de límites).
         """
+        extra_columns = extra_columns or {}
         try:
             with open(csv_path, "w", encoding="utf-8", newline="") as f:
                 w = csv.writer(f)
-                w.writerow(["Frecuencia", "THD"])
+                w.writerow(["Frecuencia", "THD", *extra_columns.keys()])
                 for i, v in enumerate(values):
                     freq = start_hz + i * step_hz
+                    extra = [col[i] if i < len(col) else "" for col in extra_columns.values()]
                     # Si querés dejar el valor crudo sin formato, usa "v" en vez de float_fmt.format(v)
-                    w.writerow([freq, float_fmt.format(v)])
+                    # NaN (punto sin lectura) se escribe vacío
+                    thd = "" if math.isnan(v) else float_fmt.format(v)
+                    w.writerow([freq, thd, *extra])
             self._emit_system(f"CSV guardado: {csv_path}")
             return csv_path
         except Exception as e:
@@ -431,18 +861,29 @@ class SerialService:
             return ""
 
     # ---------- Emisores ----------
+    def _publish(self, kind: str, data: dict):
+        """Publica un evento en el hub de streaming (si hay)."""
+        if self.event_hub is not None:
+            try:
+                self.event_hub.publish(kind, data)
+            except Exception:
+                pass
+
     def _emit_chat(self, text: str):
         """Publica una línea recibida al chat como GPIB/Arduino."""
+        self._publish("chat", {"from": "gpib", "text": text})
         if self.pubsub:
             try:
                 self.pubsub.send_all({"from": "gpib", "text": text})
             except Exception:
                 pass
-        # También a consola para debug
-        print(f"[Arduino] {text}")
+        # También a consola para debug (solo con echo_console)
+        if self.echo_console:
+            print(f"[Arduino] {text}")
 
     def _emit_system(self, text: str):
         """Mensajes de estado/errores (van al chat como 'system')."""
+        self._publish("chat", {"from": "system", "text": text})
         if self.pubsub:
             try:
                 self.pubsub.send_all({"from": "system", "text": text})
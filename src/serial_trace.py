@@ -0,0 +1,261 @@
+# src/serial_trace.py
+"""
+Grabación y reproducción de sesiones serie.
+
+Formato binario de traza (little-endian):
+    cabecera  b"THDTRACE1\\n"
+    registro  <d t><B tipo><I largo><largo bytes>
+      t     segundos monotónicos desde la apertura
+      tipo  0 = recibido (rx), 1 = enviado (tx), 2 = evento (texto: open/close/reset)
+
+Uso rápido (volcado legible):
+    python serial_trace.py sesion.trace
+"""
+import struct
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple
+
+MAGIC = b"THDTRACE1\n"
+REC = struct.Struct("<dBI")
+
+RX, TX, EVENT = 0, 1, 2
+
+
+class TraceRecorder:
+    """Escribe registros de traza con marca de tiempo monotónica (thread-safe)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "wb")
+        self._f.write(MAGIC)
+        self._t0 = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, kind: int, data: bytes):
+        if not data or self._f is None:
+            return
+        t = time.monotonic() - self._t0
+        with self._lock:
+            self._f.write(REC.pack(t, kind, len(data)))
+            self._f.write(data)
+
+    def close(self):
+        with self._lock:
+            if self._f is not None:
+                self._f.flush()
+                self._f.close()
+                self._f = None
+
+
+def read_trace(path: str) -> List[Tuple[float, int, bytes]]:
+    """Carga una traza completa como lista de (t, tipo, datos)."""
+    with open(path, "rb") as f:
+        blob = f.read()
+    if not blob.startswith(MAGIC):
+        raise ValueError(f"No es una traza THD: {path}")
+    out = []
+    pos = len(MAGIC)
+    while pos + REC.size <= len(blob):
+        t, kind, n = REC.unpack_from(blob, pos)
+        pos += REC.size
+        if pos + n > len(blob):
+            break  # registro truncado (corte durante la grabación)
+        out.append((t, kind, blob[pos:pos + n]))
+        pos += n
+    return out
+
+
+class RecordingSerial:
+    """
+    Envoltorio de serial.Serial que graba todo lo enviado y recibido.
+    Expone la misma interfaz que usa SerialService; el resto se delega.
+    """
+
+    def __init__(self, ser, recorder: TraceRecorder):
+        self._ser = ser
+        self._rec = recorder
+        self._rec.record(EVENT, b"open")
+
+    @property
+    def timeout(self):
+        return self._ser.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self._ser.timeout = value
+
+    def readline(self) -> bytes:
+        data = self._ser.readline()
+        self._rec.record(RX, data)
+        return data
+
+    def read(self, size: int = 1) -> bytes:
+        data = self._ser.read(size)
+        self._rec.record(RX, data)
+        return data
+
+    def readinto(self, b) -> int:
+        n = self._ser.readinto(b) or 0
+        self._rec.record(RX, bytes(b[:n]))
+        return n
+
+    def write(self, data: bytes) -> int:
+        self._rec.record(TX, bytes(data))
+        return self._ser.write(data)
+
+    def reset_input_buffer(self):
+        self._rec.record(EVENT, b"reset_input_buffer")
+        self._ser.reset_input_buffer()
+
+    def close(self):
+        try:
+            self._ser.close()
+        finally:
+            self._rec.record(EVENT, b"close")
+            self._rec.close()
+
+    def __getattr__(self, name):
+        return getattr(self._ser, name)
+
+
+class ReplaySerial:
+    """
+    Transporte que reproduce una traza grabada por el mismo camino de código
+    (readline/read/readinto/write) que un serial.Serial real.
+
+    Los bytes recibidos se liberan anclados a los envíos: lo que llegó después
+    del k-ésimo write de la grabación queda disponible recién cuando el código
+    hace su k-ésimo write, con el mismo retardo relativo dividido por 'speed'.
+      speed = 1.0 → tiempo real, N → N veces más rápido, 0 → sin esperas.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, timeout: Optional[float] = 1.0):
+        self.path = path
+        self.speed = max(0.0, float(speed))
+        self.timeout = timeout
+        self.port = f"replay:{path}"
+
+        records = read_trace(path)
+        # t de cada tx grabado; el segmento 0 arranca en la apertura (t=0)
+        self._tx_times = [0.0] + [t for t, kind, _ in records if kind == TX]
+        self._rx: List[Tuple[int, float, bytes]] = []  # (segmento, t, datos)
+        seg = 0
+        for t, kind, data in records:
+            if kind == TX:
+                seg += 1
+            elif kind == RX:
+                self._rx.append((seg, t, data))
+
+        self._cond = threading.Condition()
+        self._anchors = [time.monotonic()]  # instante de replay de cada segmento
+        self._next_rx = 0
+        self._buf = bytearray()
+        self._open = True
+        self.writes: List[bytes] = []
+
+    # ---------- Estado ----------
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    @property
+    def in_waiting(self) -> int:
+        with self._cond:
+            self._release()
+            return len(self._buf)
+
+    @property
+    def exhausted(self) -> bool:
+        """True cuando ya se entregó todo lo grabado."""
+        with self._cond:
+            return self._next_rx >= len(self._rx) and not self._buf
+
+    # ---------- Liberación temporizada ----------
+    def _due(self, idx: int) -> Optional[float]:
+        """Instante (monotónico) en que se libera el rx idx, o None si falta su write."""
+        seg, t, _ = self._rx[idx]
+        if seg >= len(self._anchors):
+            return None
+        if self.speed == 0:
+            return self._anchors[seg]
+        return self._anchors[seg] + (t - self._tx_times[seg]) / self.speed
+
+    def _release(self):
+        now = time.monotonic()
+        while self._next_rx < len(self._rx):
+            due = self._due(self._next_rx)
+            if due is None or due > now:
+                break
+            self._buf += self._rx[self._next_rx][2]
+            self._next_rx += 1
+
+    def _wait_for(self, ready) -> None:
+        """Espera (con timeout) a que ready() sea verdadero liberando rx a su tiempo."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            self._release()
+            if ready() or not self._open:
+                return
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return
+            due = self._due(self._next_rx) if self._next_rx < len(self._rx) else None
+            waits = [x - now for x in (due, deadline) if x is not None]
+            self._cond.wait(max(0.0, min(waits)) if waits else None)
+
+    # ---------- Interfaz tipo serial.Serial ----------
+    def readline(self) -> bytes:
+        with self._cond:
+            self._wait_for(lambda: b"\n" in self._buf)
+            i = self._buf.find(b"\n")
+            n = len(self._buf) if i < 0 else i + 1
+            out = bytes(self._buf[:n])
+            del self._buf[:n]
+            return out
+
+    def read(self, size: int = 1) -> bytes:
+        with self._cond:
+            self._wait_for(lambda: len(self._buf) >= size)
+            out = bytes(self._buf[:size])
+            del self._buf[:size]
+            return out
+
+    def readinto(self, b) -> int:
+        with self._cond:
+            self._wait_for(lambda: len(self._buf) > 0)
+            n = min(len(b), len(self._buf))
+            b[:n] = self._buf[:n]
+            del self._buf[:n]
+            return n
+
+    def write(self, data: bytes) -> int:
+        with self._cond:
+            self.writes.append(bytes(data))
+            self._anchors.append(time.monotonic())
+            self._cond.notify_all()
+        return len(data)
+
+    def reset_input_buffer(self):
+        with self._cond:
+            self._release()
+            self._buf.clear()
+
+    def close(self):
+        with self._cond:
+            self._open = False
+            self._cond.notify_all()
+
+
+def _dump(path: str):
+    for t, kind, data in read_trace(path):
+        tag = {RX: "rx", TX: "tx", EVENT: "--"}.get(kind, "??")
+        print(f"{t:10.4f} {tag} {data!r}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python serial_trace.py <archivo.trace>")
+        sys.exit(1)
+    _dump(sys.argv[1])
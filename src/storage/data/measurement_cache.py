@@ -0,0 +1,96 @@
+# storage/data/measurement_cache.py
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    dut   TEXT NOT NULL,
+    setup TEXT NOT NULL,
+    freq  REAL NOT NULL,
+    thd   REAL NOT NULL,
+    ts    REAL NOT NULL,
+    PRIMARY KEY (dut, setup, freq)
+);
+CREATE INDEX IF NOT EXISTS points_ts ON points(ts);
+"""
+
+# Comandos de la secuencia que no describen la configuración del equipo
+_NOT_SETUP = ("CLR", "RL", "FR", "UP")
+
+
+def setup_key(commands: Iterable[str]) -> str:
+    """
+    Huella de la configuración del analizador (SP, AP, FN, filtros…) a partir de
+    los comandos de inicialización. Ignora CLR/RL/FR/UP y normaliza espacios y
+    mayúsculas, así '34.0SP' y '34.0 sp' dan la misma clave.
+    """
+    parts = []
+    for cmd in commands:
+        norm = " ".join(str(cmd).upper().split())
+        if norm and not norm.startswith(_NOT_SETUP):
+            parts.append(norm)
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class MeasurementCache:
+    """
+    Caché de puntos medidos (SQLite) con clave DUT + configuración + frecuencia.
+
+    - lookup() devuelve solo puntos más nuevos que 'ttl' segundos.
+    - store() reemplaza el punto anterior con la misma clave.
+    - evict_expired() borra lo vencido; se llama al abrir y tras cada store().
+    Opcional: solo se usa si el barrido pide use_cache con un DUT.
+    """
+
+    def __init__(self, path: str = "measurement_cache.db", ttl: float = 24 * 3600.0):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self._con.executescript(_SCHEMA)
+        self.evict_expired()
+
+    def lookup(self, dut: str, setup: str, freqs: Iterable[float],
+               ttl: Optional[float] = None) -> Dict[float, dict]:
+        """{freq: {'thd', 'ts', 'age'}} de los puntos frescos encontrados."""
+        now = time.time()
+        oldest = now - (self.ttl if ttl is None else ttl)
+        wanted = {float(f) for f in freqs}
+        with self._lock:
+            rows = self._con.execute(
+                "SELECT freq, thd, ts FROM points WHERE dut = ? AND setup = ? AND ts >= ?",
+                (dut, setup, oldest),
+            ).fetchall()
+        return {f: {"thd": thd, "ts": ts, "age": now - ts} for f, thd, ts in rows if f in wanted}
+
+    def store(self, dut: str, setup: str, points: Dict[float, float]):
+        """Guarda {freq: thd} medidos ahora (los NaN no se guardan)."""
+        now = time.time()
+        rows = [(dut, setup, float(f), float(v), now) for f, v in points.items() if v == v]
+        if not rows:
+            return
+        with self._lock:
+            with self._con:
+                self._con.executemany("INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?, ?)", rows)
+        self.evict_expired()
+
+    def evict_expired(self) -> int:
+        with self._lock:
+            with self._con:
+                cur = self._con.execute("DELETE FROM points WHERE ts < ?", (time.time() - self.ttl,))
+        return cur.rowcount
+
+    def clear(self, dut: Optional[str] = None):
+        with self._lock:
+            with self._con:
+                if dut is None:
+                    self._con.execute("DELETE FROM points")
+                else:
+                    self._con.execute("DELETE FROM points WHERE dut = ?", (dut,))
+
+    def close(self):
+        with self._lock:
+            self._con.close()
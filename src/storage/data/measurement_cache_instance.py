@@ -0,0 +1,4 @@
+from .measurement_cache import MeasurementCache
+
+# Puntos reutilizables durante 24 h para el mismo DUT y configuración
+measurement_cache = MeasurementCache("measurement_cache.db", ttl=24 * 3600.0)
@@ -1,21 +1,69 @@
 # storage/data/message_store.py
+import threading
+import time
+from collections import deque
+
 
 class MessageStore:
-    def __init__(self):
-        self._messages = []
+    """
+    Mensajes del chat en memoria + suscriptores de UI.
+
+    max_in_memory: tamaño de la ventana reciente que se mantiene en memoria
+    (None = sin límite). backend: persistencia opcional (SqliteMessageBackend)
+    que guarda todo el historial y permite buscar en él.
+    Es seguro llamarlo desde varios hilos; los listeners se notifican una vez
+    por llamada (add_messages agrupa un lote en una sola notificación).
+    """
+
+    def __init__(self, max_in_memory=None, backend=None):
+        self._messages = deque(maxlen=max_in_memory)
         self._listeners = []
+        self._lock = threading.Lock()
+        self.backend = backend
+        if backend is not None and max_in_memory:
+            # Recupera la ventana reciente de la sesión anterior
+            self._messages.extend(backend.recent(max_in_memory))
 
     def add_message(self, sender, text):
-        self._messages.append({"from": sender, "text": text})
+        self.add_messages([{"from": sender, "text": text}])
+
+    def add_messages(self, messages):
+        """Agrega un lote de mensajes {'from', 'text'} con una sola notificación."""
+        now = time.time()
+        batch = [{"from": m["from"], "text": m["text"], "ts": m.get("ts", now)} for m in messages]
+        if not batch:
+            return
+        with self._lock:
+            self._messages.extend(batch)
+        if self.backend is not None:
+            for msg in batch:
+                self.backend.add(msg)
         self._notify()
 
     def get_messages(self):
-        return self._messages
+        with self._lock:
+            return list(self._messages)
+
+    def search(self, query, limit=200):
+        """Busca en todo el historial (backend) o, sin backend, en la ventana en memoria."""
+        if self.backend is not None:
+            return self.backend.search(query, limit)
+        q = (query or "").strip().lower()
+        if not q:
+            return []
+        hits = [m for m in reversed(self.get_messages()) if q in str(m["text"]).lower()]
+        return hits[:limit]
 
     def subscribe(self, listener):
-        self._listeners.append(listener)
+        with self._lock:
+            self._listeners.append(listener)
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
 
     def _notify(self):
-        for fn in self._listeners:
+        with self._lock:
+            listeners = list(self._listeners)
+        for fn in listeners:
             fn()
-
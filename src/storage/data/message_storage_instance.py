@@ -1,5 +1,7 @@
 from .message_storage import MessageStore
+from .sqlite_message_backend import SqliteMessageBackend
 
-message_store = MessageStore()
-
+# Ventana reciente en memoria; el historial completo queda en SQLite (búsqueda FTS)
+MESSAGES_IN_MEMORY = 500
 
+message_store = MessageStore(max_in_memory=MESSAGES_IN_MEMORY, backend=SqliteMessageBackend("messages.db"))
@@ -0,0 +1,91 @@
+# storage/data/migrate_csv.py
+"""
+Importa CSVs de barridos (Frecuencia, THD) al historial comprimido.
+
+Uso (desde src/):
+    python -m storage.data.migrate_csv ../thd_data*.csv --archive ../thd_archive
+
+Cada CSV se agrega como un barrido; el instante es la fecha de modificación
+del archivo. Los CSVs ya importados (misma ruta y mtime) se saltean.
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+
+import numpy as np
+
+from storage.data.sweep_archive import SweepArchive
+
+
+def read_thd_csv(path: str) -> tuple:
+    """(freqs, thd) de un CSV Frecuencia,THD; acepta coma decimal y ';'."""
+    freqs, thd = [], []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        header = f.readline()
+        delim = ";" if header.count(";") else ","
+        f.seek(0)
+        for row in csv.DictReader(f, delimiter=delim):
+            try:
+                fr = float((row.get("Frecuencia") or "").replace(",", "."))
+            except ValueError:
+                continue
+            try:
+                val = float((row.get("THD") or "").replace(",", "."))
+            except ValueError:
+                val = np.nan
+            freqs.append(fr)
+            thd.append(val)
+    return np.asarray(freqs, dtype=np.float64), np.asarray(thd, dtype=np.float64)
+
+
+def migrate(paths, archive: SweepArchive) -> int:
+    """Importa los CSV indicados; devuelve cuántos barridos se agregaron."""
+    done = {(s["meta"].get("source"), s["meta"].get("mtime")) for s in archive.sweeps()}
+    added = 0
+    for path in paths:
+        src = os.path.abspath(path)
+        mtime = os.path.getmtime(path)
+        if (src, mtime) in done:
+            print(f"Ya importado: {path}")
+            continue
+        try:
+            freqs, thd = read_thd_csv(path)
+        except Exception as e:
+            print(f"Error leyendo {path}: {e}")
+            continue
+        if freqs.size == 0:
+            print(f"Sin datos: {path}")
+            continue
+        sweep_id = archive.append_sweep(freqs, thd, ts=mtime, meta={"source": src, "mtime": mtime})
+        print(f"{path} → barrido #{sweep_id} ({freqs.size} puntos)")
+        added += 1
+    return added
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Importa CSVs THD al historial comprimido.")
+    ap.add_argument("csv", nargs="+", help="Archivos o patrones glob (thd_data*.csv)")
+    ap.add_argument("--archive", default="thd_archive", help="Directorio del historial")
+    args = ap.parse_args(argv)
+
+    paths = []
+    for pattern in args.csv:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    paths = [p for p in paths if os.path.isfile(p)]
+    if not paths:
+        print("No se encontraron CSVs.")
+        return 1
+
+    archive = SweepArchive(args.archive)
+    try:
+        added = migrate(sorted(paths, key=os.path.getmtime), archive)
+    finally:
+        archive.close()
+    print(f"Barridos importados: {added}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
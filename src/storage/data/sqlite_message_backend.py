@@ -0,0 +1,150 @@
+# storage/data/sqlite_message_backend.py
+import queue
+import sqlite3
+import threading
+from typing import List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id     INTEGER PRIMARY KEY,
+    ts     REAL NOT NULL,
+    sender TEXT NOT NULL,
+    text   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_ts ON messages(ts);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text, sender, content='messages', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, text, sender) VALUES (new.id, new.text, new.sender);
+END;
+"""
+
+
+class SqliteMessageBackend:
+    """
+    Persistencia de mensajes del chat en SQLite con búsqueda de texto completo (FTS5).
+
+    - add() solo encola: un hilo escritor inserta por lotes (una transacción por
+      lote), así el hilo de UI / de lectura serie nunca espera al disco.
+    - search() usa FTS5 si el SQLite instalado lo soporta; si no, LIKE.
+    """
+
+    def __init__(self, path: str = "messages.db", batch_size: int = 200, flush_interval: float = 0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._read_lock = threading.Lock()
+        self._reader = self._connect()
+        self.has_fts = self._init_schema(self._reader)
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    # ---------- Conexión / esquema ----------
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, check_same_thread=False)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    @staticmethod
+    def _init_schema(con: sqlite3.Connection) -> bool:
+        con.executescript(_SCHEMA)
+        try:
+            con.executescript(_FTS_SCHEMA)
+            return True
+        except sqlite3.OperationalError:
+            # SQLite compilado sin FTS5
+            return False
+
+    # ---------- Escritura por lotes ----------
+    def add(self, msg: dict):
+        """Encola un mensaje {'from', 'text', 'ts'} para persistirlo."""
+        self._queue.put(msg)
+
+    def _write_loop(self):
+        con = self._connect()
+        running = True
+        while running:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            if first is None:
+                running = False
+            else:
+                batch.append(first)
+            # Drena lo que haya, hasta batch_size
+            while running and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    with con:
+                        con.executemany(
+                            "INSERT INTO messages(ts, sender, text) VALUES (?, ?, ?)",
+                            [(m["ts"], m["from"], m["text"]) for m in batch],
+                        )
+                except sqlite3.Error as e:
+                    print(f"Error guardando mensajes: {e}")
+        con.close()
+
+    # ---------- Lectura ----------
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """Convierte texto libre en consulta FTS5 segura: términos entre comillas, prefijo en el último."""
+        terms = [t.replace('"', '""') for t in query.split()]
+        if not terms:
+            return ""
+        quoted = [f'"{t}"' for t in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def search(self, query: str, limit: int = 200) -> List[dict]:
+        """Mensajes que coinciden con query, del más reciente al más antiguo."""
+        query = (query or "").strip()
+        if not query:
+            return []
+        with self._read_lock:
+            if self.has_fts:
+                rows = self._reader.execute(
+                    "SELECT m.ts, m.sender, m.text FROM messages_fts f "
+                    "JOIN messages m ON m.id = f.rowid "
+                    "WHERE messages_fts MATCH ? ORDER BY m.id DESC LIMIT ?",
+                    (self._fts_query(query), limit),
+                ).fetchall()
+            else:
+                rows = self._reader.execute(
+                    "SELECT ts, sender, text FROM messages WHERE text LIKE ? "
+                    "ORDER BY id DESC LIMIT ?",
+                    (f"%{query}%", limit),
+                ).fetchall()
+        return [{"ts": ts, "from": sender, "text": text} for ts, sender, text in rows]
+
+    def recent(self, limit: int) -> List[dict]:
+        """Últimos 'limit' mensajes persistidos, en orden cronológico."""
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT ts, sender, text FROM messages ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{"ts": ts, "from": sender, "text": text} for ts, sender, text in reversed(rows)]
+
+    def close(self):
+        """Vacía la cola pendiente y cierra."""
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+        with self._read_lock:
+            self._reader.close()
@@ -0,0 +1,186 @@
+# storage/data/sweep_archive.py
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Columnas del archivo histórico (una archivo binario por columna)
+COLUMNS: Dict[str, np.dtype] = {
+    "ts": np.dtype("<f8"),     # instante de la medición (epoch, s)
+    "sweep": np.dtype("<i8"),  # id de barrido
+    "freq": np.dtype("<f8"),   # Hz
+    "thd": np.dtype("<f8"),    # %
+}
+MANIFEST = "chunks.jsonl"
+
+
+class SweepArchive:
+    """
+    Historial de barridos en formato columnar, comprimido y por chunks.
+
+    Estructura en disco (directorio):
+      chunks.jsonl   una línea JSON por chunk (= un barrido): id, rango de tiempo,
+                     filas, metadatos y (offset, largo) de cada columna
+      <col>.col      chunks comprimidos con zlib, concatenados (ts, sweep, freq, thd)
+
+    La lectura hace mmap de los archivos de columna y descomprime SOLO los chunks
+    del rango de tiempo pedido y SOLO las columnas pedidas; nunca carga todo el
+    historial en memoria ni pasa por pandas.
+    """
+
+    def __init__(self, path: str = "thd_archive", level: int = 6):
+        self.path = path
+        self.level = level
+        self._lock = threading.Lock()
+        self._chunks: List[dict] = []
+        self._maps: Dict[str, tuple] = {}   # col -> (file, mmap, tamaño mapeado)
+        os.makedirs(path, exist_ok=True)
+        self._load_manifest()
+
+    # ---------- Manifest ----------
+    def _load_manifest(self):
+        mpath = os.path.join(self.path, MANIFEST)
+        if not os.path.exists(mpath):
+            return
+        with open(mpath, "r", encoding="utf-8") as f:
+            for ln in f:
+                ln = ln.strip()
+                if not ln:
+                    continue
+                try:
+                    self._chunks.append(json.loads(ln))
+                except ValueError:
+                    # Línea truncada por un corte: se ignora (sus bytes quedan huérfanos)
+                    pass
+
+    def _next_sweep_id(self) -> int:
+        return (self._chunks[-1]["sweep"] + 1) if self._chunks else 1
+
+    # ---------- Escritura ----------
+    def append_sweep(
+        self,
+        freqs: Iterable[float],
+        thd: Iterable[float],
+        ts: Optional[float] = None,
+        meta: Optional[dict] = None,
+    ) -> int:
+        """
+        Agrega un barrido como un chunk nuevo y devuelve su id.
+        ts: instante del barrido (por defecto ahora); meta: datos libres (origen, DUT, ...).
+        """
+        f = np.ascontiguousarray(freqs, dtype=COLUMNS["freq"])
+        y = np.ascontiguousarray(thd, dtype=COLUMNS["thd"])
+        if f.shape != y.shape or f.ndim != 1:
+            raise ValueError("freqs y thd deben ser vectores del mismo largo")
+        ts = time.time() if ts is None else float(ts)
+
+        with self._lock:
+            sweep_id = self._next_sweep_id()
+            data = {
+                "ts": np.full(f.size, ts, dtype=COLUMNS["ts"]),
+                "sweep": np.full(f.size, sweep_id, dtype=COLUMNS["sweep"]),
+                "freq": f,
+                "thd": y,
+            }
+            cols = {}
+            for name, arr in data.items():
+                blob = zlib.compress(arr.tobytes(), self.level)
+                with open(self._col_path(name), "ab") as fh:
+                    offset = fh.tell()
+                    fh.write(blob)
+                cols[name] = [offset, len(blob)]
+
+            chunk = {
+                "sweep": sweep_id,
+                "t_start": ts,
+                "t_end": ts,
+                "rows": int(f.size),
+                "f_min": float(np.nanmin(f)) if f.size else None,
+                "f_max": float(np.nanmax(f)) if f.size else None,
+                "meta": meta or {},
+                "columns": cols,
+            }
+            # El manifest se escribe al final: si se corta antes, el chunk no existe
+            with open(os.path.join(self.path, MANIFEST), "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+            self._chunks.append(chunk)
+        return sweep_id
+
+    # ---------- Lectura ----------
+    def _col_path(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.col")
+
+    def _mapped(self, name: str, needed: int) -> mmap.mmap:
+        """mmap de solo lectura de la columna; se re-mapea si el archivo creció."""
+        entry = self._maps.get(name)
+        if entry is not None and entry[2] >= needed:
+            return entry[1]
+        if entry is not None:
+            entry[1].close()
+            entry[0].close()
+        fh = open(self._col_path(name), "rb")
+        size = os.fstat(fh.fileno()).st_size
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[name] = (fh, mm, size)
+        return mm
+
+    def _decode(self, chunk: dict, name: str) -> np.ndarray:
+        offset, length = chunk["columns"][name]
+        mm = self._mapped(name, offset + length)
+        raw = zlib.decompress(mm[offset:offset + length])
+        return np.frombuffer(raw, dtype=COLUMNS[name])
+
+    def sweeps(self, t0: Optional[float] = None, t1: Optional[float] = None) -> List[dict]:
+        """Metadatos de los barridos en [t0, t1] (sin leer datos)."""
+        with self._lock:
+            return [
+                {k: v for k, v in c.items() if k != "columns"}
+                for c in self._chunks
+                if (t0 is None or c["t_end"] >= t0) and (t1 is None or c["t_start"] <= t1)
+            ]
+
+    def read(
+        self,
+        columns: Iterable[str] = ("freq", "thd"),
+        t0: Optional[float] = None,
+        t1: Optional[float] = None,
+        sweep_ids: Optional[Iterable[int]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Lee las columnas pedidas de los chunks en [t0, t1] (y/o de sweep_ids).
+        Devuelve {columna: array} concatenado en orden de escritura.
+        """
+        columns = list(columns)
+        for name in columns:
+            if name not in COLUMNS:
+                raise KeyError(f"Columna desconocida: {name}")
+        wanted = set(sweep_ids) if sweep_ids is not None else None
+
+        with self._lock:
+            chunks = [
+                c for c in self._chunks
+                if (t0 is None or c["t_end"] >= t0) and (t1 is None or c["t_start"] <= t1)
+                and (wanted is None or c["sweep"] in wanted)
+            ]
+            parts = {name: [self._decode(c, name) for c in chunks] for name in columns}
+
+        return {
+            name: (np.concatenate(arrs) if arrs else np.empty(0, dtype=COLUMNS[name]))
+            for name, arrs in parts.items()
+        }
+
+    def read_sweep(self, sweep_id: int) -> Dict[str, np.ndarray]:
+        """Frecuencia y THD de un barrido."""
+        return self.read(("freq", "thd"), sweep_ids=[sweep_id])
+
+    def close(self):
+        with self._lock:
+            for fh, mm, _ in self._maps.values():
+                mm.close()
+                fh.close()
+            self._maps.clear()
@@ -0,0 +1,3 @@
+from .sweep_archive import SweepArchive
+
+sweep_archive = SweepArchive("thd_archive")
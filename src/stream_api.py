@@ -0,0 +1,210 @@
+# src/stream_api.py
+"""
+API local de streaming para ver mediciones en vivo desde otras herramientas.
+
+Endpoints (por defecto http://127.0.0.1:8765):
+  GET  /events?since=N   Server-Sent Events: puntos, estado de barrido y chat/log.
+                         Reanuda desde N (o desde el header Last-Event-ID).
+  GET  /events/poll?since=N&timeout=S
+                         Igual pero en JSON (long-poll) para clientes sin SSE.
+  GET  /status           Estado de la cola y último número de secuencia.
+  GET  /sweeps           Trabajos de la cola.
+  POST /sweeps           Encola un barrido (Content-Type: application/json
+                         obligatorio, sin CORS): {"repeats", "delay", "start_hz",
+                         "step_hz", "priority", "output", "instrument",
+                         "defer_failed", "dut", "use_cache"}; "output" es un
+                         nombre .csv sin rutas (queda en el directorio de datos).
+"""
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+KEEPALIVE_SECS = 15.0
+
+
+class EventHub:
+    """
+    Fan-out único de eventos con número de secuencia.
+
+    publish() agrega al buffer circular y despierta a todos los suscriptores
+    de una vez (Condition); cada cliente solo recuerda su último seq, así que
+    no hay una cola por cliente y los suscriptores lentos no frenan al productor.
+    """
+
+    def __init__(self, maxlen: int = 10000):
+        self._events: deque = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._seq = 0
+
+    @property
+    def last_seq(self) -> int:
+        with self._cond:
+            return self._seq
+
+    def publish(self, kind: str, data: dict) -> int:
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, kind, time.time(), data))
+            self._cond.notify_all()
+            return self._seq
+
+    def since(self, seq: int, timeout: Optional[float] = None) -> Tuple[List[tuple], bool]:
+        """
+        Eventos con número > seq (espera hasta timeout si no hay).
+        Devuelve (eventos, hueco): hueco=True si parte de lo pedido ya salió del buffer.
+        Un seq mayor que el último publicado viene de una corrida anterior del
+        servidor (la numeración reinicia): se toma como hueco y se repite todo el buffer.
+        """
+        with self._cond:
+            stale = seq > self._seq
+            if stale:
+                seq = 0
+            if self._seq <= seq and timeout:
+                self._cond.wait_for(lambda: self._seq > seq, timeout)
+            if not self._events:
+                return [], False
+            first = self._events[0][0]
+            gap = stale or seq + 1 < first
+            # El buffer es contiguo: se indexa directo en vez de recorrerlo
+            start = max(0, seq + 1 - first)
+            return [self._events[i] for i in range(start, len(self._events))], gap
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "THDStream/1.0"
+    api: "StreamServer" = None  # lo asigna StreamServer
+
+    # ---------- Utilidades ----------
+    def log_message(self, fmt, *args):
+        pass  # sin ruido en consola
+
+    def _json(self, code: int, payload, cors: bool = True):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if cors:
+            self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _since(self, query: dict) -> int:
+        raw = (query.get("since") or [None])[0] or self.headers.get("Last-Event-ID")
+        try:
+            return int(raw) if raw is not None else self.api.hub.last_seq
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def _event_dict(ev: tuple) -> dict:
+        seq, kind, ts, data = ev
+        return {"seq": seq, "type": kind, "ts": ts, "data": data}
+
+    # ---------- GET ----------
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/events":
+            self._stream(self._since(query))
+        elif url.path == "/events/poll":
+            try:
+                timeout = min(60.0, float((query.get("timeout") or ["25"])[0]))
+            except ValueError:
+                timeout = 25.0
+            events, gap = self.api.hub.since(self._since(query), timeout=timeout)
+            self._json(200, {"gap": gap, "last_seq": self.api.hub.last_seq,
+                             "events": [self._event_dict(e) for e in events]})
+        elif url.path == "/status":
+            self._json(200, {"last_seq": self.api.hub.last_seq, **self.api.status()})
+        elif url.path == "/sweeps":
+            self._json(200, self.api.list_sweeps())
+        else:
+            self._json(404, {"error": "no encontrado"})
+
+    def _stream(self, seq: int):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        try:
+            while not self.api.stopping:
+                events, gap = self.api.hub.since(seq, timeout=KEEPALIVE_SECS)
+                if gap:
+                    self.wfile.write(b"event: gap\ndata: {}\n\n")
+                if not events:
+                    self.wfile.write(b": keepalive\n\n")
+                for ev in events:
+                    seq = ev[0]
+                    payload = json.dumps(self._event_dict(ev), ensure_ascii=False)
+                    self.wfile.write(f"id: {seq}\nevent: {ev[1]}\ndata: {payload}\n\n".encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    # ---------- POST ----------
+    def do_POST(self):
+        # Sin CORS y solo JSON: un POST application/json desde otra página exige
+        # preflight (que no se atiende), así un navegador no puede encolar barridos.
+        if urlparse(self.path).path != "/sweeps":
+            self._json(404, {"error": "no encontrado"}, cors=False)
+            return
+        ctype = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if ctype != "application/json":
+            self._json(415, {"error": "se requiere Content-Type: application/json"}, cors=False)
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("se esperaba un objeto JSON")
+            job_id = self.api.submit(body)
+        except (ValueError, TypeError, KeyError) as e:
+            self._json(400, {"error": str(e)}, cors=False)
+            return
+        except RuntimeError as e:
+            self._json(503, {"error": str(e)}, cors=False)
+            return
+        self._json(202, {"job_id": job_id}, cors=False)
+
+
+class StreamServer:
+    """
+    Servidor HTTP local (hilo aparte) sobre un EventHub.
+    submit(dict) encola un barrido y devuelve su id; status()/list_sweeps() informan la cola.
+    """
+
+    def __init__(
+        self,
+        hub: EventHub,
+        submit: Callable[[dict], int],
+        status: Callable[[], dict] = lambda: {},
+        list_sweeps: Callable[[], list] = lambda: [],
+        host: str = "127.0.0.1",
+        port: int = 8765,
+    ):
+        self.hub = hub
+        self.submit = submit
+        self.status = status
+        self.list_sweeps = list_sweeps
+        self.host = host
+        self.port = port
+        self.stopping = False
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    def start(self):
+        handler = type("Handler", (_Handler,), {"api": self})
+        self._httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        print(f"API de streaming en http://{self.host}:{self.port}")
+
+    def stop(self):
+        self.stopping = True
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
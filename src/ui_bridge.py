@@ -0,0 +1,118 @@
+# src/ui_bridge.py
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, List, Optional
+
+POLICY_BLOCK = "block"              # el productor espera lugar (hasta block_timeout)
+POLICY_DROP_OLDEST = "drop_oldest"  # se descarta el mensaje más viejo de la cola
+POLICY_SUMMARIZE = "summarize"      # se descartan los nuevos y se entrega un resumen
+
+
+class UiBridge:
+    """
+    Puente de hilos de E/S (lectura/envío serie) hacia el event loop de Flet.
+
+    Los hilos llaman send_all()/post() (misma firma que page.pubsub.send_all,
+    así SerialService lo usa sin cambios): el mensaje se encola en una cola
+    acotada y el hilo vuelve enseguida al puerto. pump() corre en el loop de la
+    UI, drena la cola por lotes y entrega cada lote de una sola vez.
+    Cuando la cola se llena se aplica la política de contrapresión elegida.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 2000,
+        policy: str = POLICY_DROP_OLDEST,
+        batch_max: int = 200,
+        block_timeout: float = 1.0,
+    ):
+        if policy not in (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_SUMMARIZE):
+            raise ValueError(f"Política desconocida: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.batch_max = batch_max
+        self.block_timeout = block_timeout
+
+        self._items: deque = deque()
+        self._cond = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._wake_pending = False
+
+        # Contadores de contrapresión
+        self.dropped = 0
+        self._summary: dict = {}  # sender -> [cantidad, último texto]
+
+    # ---------- Lado productor (cualquier hilo) ----------
+    def send_all(self, data):
+        """Compatible con pubsub.send_all: encola y vuelve."""
+        self.post(data)
+
+    def post(self, msg) -> bool:
+        """Encola msg; devuelve False si se descartó por la política."""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.policy == POLICY_BLOCK:
+                    if not self._cond.wait_for(lambda: len(self._items) < self.maxsize, self.block_timeout):
+                        self.dropped += 1
+                        return False
+                elif self.policy == POLICY_DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    sender = msg.get("from", "?") if isinstance(msg, dict) else "?"
+                    entry = self._summary.setdefault(sender, [0, ""])
+                    entry[0] += 1
+                    entry[1] = msg.get("text", "") if isinstance(msg, dict) else str(msg)
+                    self.dropped += 1
+                    self._signal()
+                    return False
+            self._items.append(msg)
+            self._signal()
+        return True
+
+    def _signal(self):
+        # Una sola llamada threadsafe por tanda (no una por mensaje)
+        if self._loop is None or self._wake_pending:
+            return
+        self._wake_pending = True
+        try:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            pass  # loop cerrado
+
+    # ---------- Lado consumidor (event loop) ----------
+    def _take_batch(self) -> List:
+        with self._cond:
+            self._wake_pending = False
+            n = min(len(self._items), self.batch_max)
+            batch = [self._items.popleft() for _ in range(n)]
+            if not self._items and self._summary:
+                for sender, (count, last) in self._summary.items():
+                    batch.append({"from": "system",
+                                  "text": f"{count} mensaje(s) de '{sender}' resumidos por saturación. Último: {last}"})
+                self._summary.clear()
+            if n:
+                self._cond.notify_all()  # libera productores en modo block
+            return batch
+
+    async def pump(self, deliver: Callable[[List], None]):
+        """Bucle del lado UI: espera mensajes y llama deliver(lote) en el loop."""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while True:
+            batch = self._take_batch()
+            if batch:
+                try:
+                    deliver(batch)
+                except Exception as ex:
+                    print(f"Error entregando mensajes a la UI: {ex}")
+                # Cede el loop entre lotes para no congelar la UI
+                await asyncio.sleep(0)
+                continue
+            self._wake.clear()
+            with self._cond:
+                pending = bool(self._items) or bool(self._summary)
+            if not pending:
+                await self._wake.wait()
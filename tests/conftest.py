@@ -0,0 +1,125 @@
+# tests/conftest.py
+import os
+import time
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+
+@pytest.fixture(autouse=True)
+def _workdir(tmp_path, monkeypatch):
+    """Los módulos de la app crean archivos en el cwd (log.txt, CSV, bases SQLite)."""
+    monkeypatch.chdir(tmp_path)
+
+
+class MuteSerial:
+    """Serial en memoria de un equipo que no contesta: toma los comandos y nunca responde."""
+
+    def __init__(self, timeout: float = 0.05):
+        self.timeout = timeout
+        self.is_open = True
+        self.written = []
+
+    def write(self, data) -> int:
+        self.written.append(bytes(data).strip().decode())
+        return len(data)
+
+    def readline(self) -> bytes:
+        return b""
+
+    def reset_input_buffer(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+@pytest.fixture
+def mute_serial():
+    return MuteSerial()
+
+
+class SlowSerial(MuteSerial):
+    """Contesta cada RL con 'reply' tras 'latency' segundos, solo mientras alive=True."""
+
+    def __init__(self, latency: float, reply: bytes = b"0.0150\r\n", timeout: float = 1.0):
+        super().__init__(timeout=timeout)
+        self.latency = latency
+        self.reply = reply
+        self.alive = True
+        self._due = []
+
+    def write(self, data) -> int:
+        n = super().write(data)
+        if self.alive and self.written[-1] == "RL":
+            self._due.append(time.monotonic() + self.latency)
+        return n
+
+    def readline(self) -> bytes:
+        end = time.monotonic() + (self.timeout or 0)
+        while True:
+            now = time.monotonic()
+            if self._due and self._due[0] <= now:
+                self._due.pop(0)
+                return self.reply
+            nxt = min([end] + self._due[:1])
+            if now >= end:
+                return b""
+            time.sleep(max(0.0, min(0.005, nxt - now)))
+
+    def reset_input_buffer(self):
+        self._due = [t for t in self._due if t > time.monotonic()]
+
+
+@pytest.fixture
+def slow_serial():
+    """Fábrica de SlowSerial (latencia en segundos)."""
+    return SlowSerial
+
+
+class ScriptedSerial(MuteSerial):
+    """
+    Arduino simulado sin esperas: cada RL agrega 'reply' a la entrada y los
+    comandos de 'errors' agregan la línea de error del firmware indicada.
+    """
+
+    def __init__(self, reply: bytes = b"0.0150\r\n", errors: dict = None):
+        super().__init__()
+        self.reply = reply
+        self.errors = dict(errors or {})
+        self._input = bytearray()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._input)
+
+    def write(self, data) -> int:
+        n = super().write(data)
+        cmd = self.written[-1]
+        if cmd in self.errors:
+            self._input += self.errors[cmd]
+        elif cmd == "RL":
+            self._input += self.reply
+        return n
+
+    def read(self, size: int = 1) -> bytes:
+        data = bytes(self._input[:size])
+        del self._input[:size]
+        return data
+
+    def readline(self) -> bytes:
+        i = self._input.find(b"\n")
+        return self.read(len(self._input) if i < 0 else i + 1)
+
+    def reset_input_buffer(self):
+        self._input.clear()
+
+
+@pytest.fixture
+def scripted_serial():
+    """Fábrica de ScriptedSerial."""
+    return ScriptedSerial
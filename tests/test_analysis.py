@@ -0,0 +1,27 @@
+# tests/test_analysis.py
+import numpy as np
+
+import analysis
+
+
+def test_area_une_los_vecinos_del_hueco():
+    f = np.array([1.0, 2.0, 3.0])
+    y = np.array([[1.0, np.nan, 3.0], [1.0, 2.0, 3.0], [np.nan, 5.0, np.nan]])
+    auc = analysis.area_under_curve(f, y, log_freq=False)
+    assert np.allclose(auc, [4.0, 4.0, 0.0])
+    assert float(analysis.area_under_curve(f, y[0], log_freq=False)) == 4.0
+
+
+def test_interpolacion_del_lote_igual_a_fila_por_fila():
+    rng = np.random.default_rng(7)
+    f = np.geomspace(20, 20000, 40)
+    y = rng.uniform(0.001, 1.0, (6, f.size))
+    y[rng.random(y.shape) < 0.3] = np.nan
+    y[5, 1:] = np.nan  # un solo punto válido → todo NaN
+    centers = analysis.band_centers(3)
+    out = analysis.interpolate_to_bands(f, y, centers)
+    for r, row in enumerate(y):
+        m = ~np.isnan(row)
+        expected = (np.interp(np.log10(centers), np.log10(f[m]), row[m], left=np.nan, right=np.nan)
+                    if m.sum() >= 2 else np.full(centers.size, np.nan))
+        assert np.allclose(out[r], expected, equal_nan=True)
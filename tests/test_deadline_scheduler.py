@@ -0,0 +1,12 @@
+# tests/test_deadline_scheduler.py
+from deadline_scheduler import DeadlineScheduler
+
+
+def test_intervalo_cero_no_cuenta_resincronizaciones():
+    sched = DeadlineScheduler(0.0, spin_window=0.0)
+    for _ in range(20):
+        assert sched.wait_next()
+    stats = sched.stats()
+    assert stats["sent"] == 20
+    assert stats["resyncs"] == 0
+    assert stats["max_lateness"] < 0.05
@@ -0,0 +1,63 @@
+# tests/test_instrument_state.py
+from line_reader import LineReader
+from serial_service import SerialService
+
+NDAC = b"gpibWrite: timeout waiting NDAC\r\n"
+WRITE_FAILED = b"set_comm_cntx: gpib write failed @1\r\n"
+
+
+def _sweep(svc):
+    return svc.run_measurement_sequence(
+        repeats=1, delay=0, csv_path="thd.csv", start_hz=1000, step_hz=1000,
+        rl_retries=0, rl_retry_delay=0,
+    )
+
+
+def _service(ser):
+    svc = SerialService(port="test", timeout=0.05, auto_read=False)
+    svc.ser = ser
+    return svc
+
+
+def test_sin_errores_el_segundo_barrido_omite_la_configuracion(scripted_serial):
+    ser = scripted_serial()
+    svc = _service(ser)
+    _sweep(svc)
+    assert svc.instrument_state.known
+    ser.written.clear()
+    _sweep(svc)
+    assert "CLR" not in ser.written
+
+
+def test_error_del_bus_en_entrada_descartada_invalida_el_modelo(scripted_serial):
+    # El error llega tras un ajuste y queda en la entrada hasta que _drain_input la limpia antes del RL
+    ser = scripted_serial(errors={"AP 1.0VL": WRITE_FAILED})
+    svc = _service(ser)
+    assert _sweep(svc) == [0.015, 0.015]
+    assert not svc.instrument_state.known
+    ser.written.clear()
+    _sweep(svc)
+    assert ser.written[0] == "CLR"
+
+
+def test_error_del_bus_como_respuesta_invalida_el_modelo(scripted_serial):
+    ser = scripted_serial()
+    svc = _service(ser)
+    _sweep(svc)
+    assert svc.instrument_state.known
+    ser.reply = NDAC
+    svc.send("RL")
+    assert svc._try_read_numeric_once(max_wait=0.05) is None
+    assert not svc.instrument_state.known
+
+
+def test_error_del_bus_en_lectura_continua_invalida_el_modelo(scripted_serial, tmp_path):
+    ser = scripted_serial(reply=NDAC)
+    svc = _service(ser)
+    svc.instrument_state.observe("CLR")
+    ser.write(b"RL\n")
+    reader = LineReader(ser)
+    with open(tmp_path / "log.txt", "wb") as log_file:
+        while svc._pump_lines(reader, log_file):
+            pass
+    assert not svc.instrument_state.known
@@ -0,0 +1,59 @@
+# tests/test_retry_policy.py
+import time
+
+from retry_policy import AdaptiveRetryPolicy, REPLY_GARBAGE, REPLY_NUMBER, REPLY_SILENCE
+from serial_service import SerialService
+
+
+def _kill(policy):
+    for _ in range(policy.dead_after):
+        policy.observe("RL", 1000, None, REPLY_SILENCE)
+
+
+def test_enlace_muerto_sondea_con_timeout_aprendido():
+    policy = AdaptiveRetryPolicy(default_timeout=0.8, min_timeout=0.15)
+    _kill(policy)
+    assert policy.link_dead
+    assert policy.retries_for(3) == 0
+    # La sonda no se achica a min_timeout: un equipo lento tiene que poder contestar
+    assert policy.timeout_for("RL", 1000) == 0.8
+
+
+def test_enlace_revive_con_cualquier_respuesta():
+    for outcome, latency in ((REPLY_NUMBER, 0.2), (REPLY_GARBAGE, None)):
+        policy = AdaptiveRetryPolicy()
+        _kill(policy)
+        policy.observe("RL", 1000, latency, outcome)
+        assert not policy.link_dead
+        assert policy.retries_for(3) == 3
+
+
+def test_enlace_revive_tras_enfriamiento_y_reset():
+    policy = AdaptiveRetryPolicy(cooldown=0.05)
+    _kill(policy)
+    assert policy.link_dead
+    time.sleep(0.06)
+    assert not policy.link_dead
+    assert policy.retries_for(3) == 3
+
+    policy = AdaptiveRetryPolicy()
+    _kill(policy)
+    policy.reset()
+    assert not policy.link_dead
+
+
+def test_lectura_se_recupera_tras_enlace_muerto(slow_serial):
+    # Latencia mayor que min_timeout: con la sonda acotada a min_timeout no volvía nunca
+    ser = slow_serial(latency=0.3)
+    svc = SerialService(port="test", timeout=1.0, auto_read=False,
+                        retry_policy=AdaptiveRetryPolicy(default_timeout=0.6, min_timeout=0.15))
+    svc.ser = ser
+    ser.alive = False
+    for _ in range(svc.retry_policy.dead_after):
+        assert svc._request_reading(1000, 0, 0.0, 0.0) == 0.0
+    assert svc.retry_policy.link_dead
+
+    ser.alive = True
+    assert svc._request_reading(1000, 2, 0.0, 0.0) == 0.015
+    assert svc.last_failure == ""
+    assert not svc.retry_policy.link_dead
@@ -0,0 +1,34 @@
+# tests/test_serial_service.py
+from limit_mask import LimitMask, VERDICT_FAIL
+from serial_service import SerialService
+
+
+def _service(ser):
+    svc = SerialService(port="test", timeout=0.05, auto_read=False)
+    svc.ser = ser
+    return svc
+
+
+def test_equipo_sin_respuesta_falla_la_mascara(mute_serial):
+    svc = _service(mute_serial)
+    mask = LimitMask([(20, 1.0), (20000, 1.0)])
+    values = svc.run_measurement_sequence(
+        repeats=2, delay=0, csv_path="thd.csv", start_hz=1000, step_hz=1000,
+        rl_retries=0, rl_retry_delay=0, limit_mask=mask,
+    )
+    # El 0.0 de respaldo no debe aprobar: sin lectura es FALLA
+    assert values == [0.0, 0.0, 0.0]
+    assert all(svc.last_reasons)
+    assert [v["verdict"] for v in svc.last_verdicts] == [VERDICT_FAIL] * 3
+    assert LimitMask.overall(svc.last_verdicts) == VERDICT_FAIL
+
+
+def test_abort_on_fail_aplica_a_lecturas_fallidas(mute_serial):
+    svc = _service(mute_serial)
+    mask = LimitMask([(20, 1.0), (20000, 1.0)])
+    values = svc.run_measurement_sequence(
+        repeats=5, delay=0, csv_path="thd.csv", start_hz=1000, step_hz=1000,
+        rl_retries=0, rl_retry_delay=0, limit_mask=mask, abort_on_fail=True,
+    )
+    assert len(values) == 1
+    assert "UP" not in mute_serial.written
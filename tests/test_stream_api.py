@@ -0,0 +1,34 @@
+# tests/test_stream_api.py
+import pytest
+
+from stream_api import EventHub
+
+
+def test_since_seq_de_una_corrida_anterior_repite_el_buffer():
+    hub = EventHub()
+    for i in range(3):
+        hub.publish("point", {"index": i})
+    # El cliente traía Last-Event-ID=500 de antes del reinicio del servidor
+    events, gap = hub.since(500, timeout=0)
+    assert gap
+    assert [e[0] for e in events] == [1, 2, 3]
+
+
+def test_since_seq_al_dia_espera_sin_hueco():
+    hub = EventHub()
+    hub.publish("point", {})
+    assert hub.since(1, timeout=0.01) == ([], False)
+
+
+@pytest.mark.parametrize("output", ["../x.csv", "/tmp/x.csv", "sub/x.csv", "..\\x.csv",
+                                    "C:x.csv", "datos.txt"])
+def test_submit_sweep_rechaza_rutas_en_output(output):
+    main = pytest.importorskip("main")
+    with pytest.raises(ValueError):
+        main._output_name(output)
+
+
+def test_submit_sweep_acepta_nombre_csv():
+    main = pytest.importorskip("main")
+    assert main._output_name(None) == "thd_data.csv"
+    assert main._output_name("dut_42.csv") == "dut_42.csv"